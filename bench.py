@@ -0,0 +1,351 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import synth
+
+
+# Benchmarks for every dashboard computation against a synthetic corpus. The
+# corpus is served by a local HTTP server standing in for the data origin, so
+# the app's real fetch path (data cache, revalidation, CSV parsing) is
+# exercised without touching the network.
+#
+# Each computation is timed in isolation:
+#   cold    one run with an empty data cache (HTTP fetch + parse + build)
+#   warm    --repeat runs with the data (and parsed frames) cached but derived
+#           state (sleep cube, term index) reset, i.e. the cost of the
+#           computation itself
+#   memory  one warm run under tracemalloc: peak bytes, and bytes / blocks
+#           still allocated afterwards. tracemalloc only sees live blocks, so
+#           net_blocks is the allocation count reported: blocks the run left
+#           allocated, not every malloc it made (that needs a malloc-level
+#           profiler such as memray, which is not a dependency)
+#
+# Results are JSON lines, one per computation, so runs can be diffed:
+#
+#   python bench.py --clients 1000 --log-rows 200000 --out before.jsonl
+#   python bench.py --clients 1000 --log-rows 200000 --compare before.jsonl
+#
+# --startup measures each page from a fresh interpreter instead, as after a
+# container cold start: the app shell's imports, the page module's imports,
+# the first render with an empty data cache, and the median of --repeat
+# reruns in the same process (Streamlit's rerun on every interaction).
+
+BENCHMARKS = [
+    "plot_housing_periods",
+    "plot_housing_occupancy",
+    "plot_visits_from_csv",
+    "visit_drilldown",
+    "generate_patient_visits_radar",
+    "generate_service_usage_pie_chart",
+    "generate_service_usage_stacked_bar_chart",
+    "generate_cohort_radar",
+    "plot_program_matrix",
+    "generate_cohort_storage_chart",
+    "sleep_calendar",
+    "plot_sleep_calendar",
+    "plot_nightly_beds",
+    "plot_floor_utilisation",
+    "generate_word_treemap",
+]
+
+STARTUP_PAGES = ["dashboard_page", "journey_page", "cohort_page"]
+
+# (label, result field) compared by --compare
+METRICS = (("time", "median_s"), ("memory", "peak_bytes"))
+STARTUP_METRICS = (("cold", "cold_s"), ("rerun", "median_s"))
+
+# Runs in a fresh interpreter: imports and renders one page module outside a
+# Streamlit server (widgets return their defaults) and prints its timings
+_STARTUP = """
+import importlib, json, logging, statistics, sys, time, warnings
+start = time.perf_counter()
+warnings.simplefilter("ignore")
+logging.disable(logging.CRITICAL)
+import streamlit
+import data_cache, figure_cache, frame_cache, stream, tracing
+shell = time.perf_counter()
+page = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+page.show()
+first = time.perf_counter()
+reruns = []
+for _ in range(int(sys.argv[2])):
+    rerun = time.perf_counter()
+    page.show()
+    reruns.append(time.perf_counter() - rerun)
+print(json.dumps({
+    "shell_import_s": shell - start,
+    "page_import_s": imported - shell,
+    "first_render_s": first - imported,
+    "median_s": statistics.median(reruns) if reruns else None,
+    "runs": len(reruns),
+    "modules": len(sys.modules),
+}))
+"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    # Data origin stand-in on an ephemeral localhost port; returns (server, base url)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(run, reset, repeat):
+    reset()
+    start = time.perf_counter()
+    run()
+    cold = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeat):
+        reset(data=False)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    reset(data=False)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    net = after.compare_to(before, "filename")
+    return {
+        "cold_s": cold,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "runs": repeat,
+        "peak_bytes": peak,
+        "net_bytes": sum(s.size_diff for s in net),
+        "net_blocks": sum(s.count_diff for s in net),
+    }
+
+
+def run(corpus, repeat=5, only=None, client=None, snapshot_dir=None, log=print):
+    clients = synth.read_manifest(corpus)
+    server, base_url = serve(corpus)
+    cache_dir = tempfile.mkdtemp(prefix="tt-bench-cache-")
+
+    # The data modules read their configuration at import time
+    os.environ.pop("TT_DATA_DIR", None)
+    os.environ["TT_DATA_URL"] = base_url
+    os.environ["TT_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("TT_CACHE_MAX_MB", "4096")
+    os.environ["TT_SNAPSHOT_DIR"] = snapshot_dir or os.path.join(cache_dir, "no-snapshot")
+    os.environ["TT_CATALOG"] = os.path.join(corpus, "clients.jsonl")
+    warnings.simplefilter("ignore", FutureWarning)
+    import charts
+    import data_cache
+    import frame_cache
+    import sleep
+    import term_index
+
+    # Benchmark the client with the longest log unless told otherwise
+    target = client or max(clients, key=lambda c: c["logs"])["client"]
+    logs = next(c["logs"] for c in clients if c["client"] == target)
+    visits_url = data_cache.data_url("bar_stack.csv")
+    log_url = data_cache.data_url(f"{target}.csv")
+
+    def visit_drilldown():
+        # Every program -> the busiest program's clients -> its monthly trend
+        rollups = charts.load_visit_rollups(visits_url)
+        program = rollups.query(("Reason",)).idxmax()
+        return rollups.query(("Patient.ID",), programs=[program]), rollups.query(("Date",), programs=[program])
+
+    computations = {
+        "plot_housing_periods": charts.plot_housing_periods,
+        "plot_housing_occupancy": charts.plot_housing_occupancy,
+        "plot_visits_from_csv": lambda: charts.plot_visits_from_csv(visits_url),
+        "visit_drilldown": visit_drilldown,
+        "generate_patient_visits_radar": lambda: charts.generate_patient_visits_radar(visits_url, target),
+        "generate_service_usage_pie_chart": lambda: charts.generate_service_usage_pie_chart(target),
+        "generate_service_usage_stacked_bar_chart": lambda: charts.generate_service_usage_stacked_bar_chart(target),
+        "generate_cohort_radar": lambda: charts.generate_cohort_radar(visits_url),
+        "plot_program_matrix": lambda: charts.plot_program_matrix(visits_url),
+        "generate_cohort_storage_chart": charts.generate_cohort_storage_chart,
+        "sleep_calendar": lambda: charts.load_sleep_cube().calendar(target),
+        "plot_sleep_calendar": lambda: charts.plot_sleep_calendar(target),
+        "plot_nightly_beds": charts.plot_nightly_beds,
+        "plot_floor_utilisation": charts.plot_floor_utilisation,
+        "generate_word_treemap": lambda: charts.generate_word_treemap(log_url),
+    }
+
+    def reset(data=True):
+        charts.reset()
+        sleep.reset()
+        term_index.reset()
+        if data:
+            frame_cache.get_cache().clear()
+            cache = data_cache.get_cache()
+            cache.clear()
+            shutil.rmtree(cache.cache_dir, ignore_errors=True)
+            os.makedirs(cache.cache_dir, exist_ok=True)
+
+    context = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "clients": len(clients),
+        "log_rows": sum(c["logs"] for c in clients),
+        "client": target,
+        "client_log_rows": logs,
+        "snapshot": bool(snapshot_dir),
+    }
+    results = []
+    try:
+        for name in BENCHMARKS:
+            if only and name not in only:
+                continue
+            result = {"benchmark": name, **measure(computations[name], reset, repeat), **context}
+            results.append(result)
+            log(f"{name:<42} cold {result['cold_s']:8.3f}s  median {result['median_s']:8.3f}s  peak {result['peak_bytes'] / 2 ** 20:8.1f} MiB")
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def startup(corpus, repeat=5, snapshot_dir=None, log=print):
+    # Cold start and rerun time of every page, each in its own interpreter with an empty data cache
+    server, base_url = serve(corpus)
+    env = dict(os.environ, TT_DATA_URL=base_url, TT_CATALOG=os.path.join(corpus, "clients.jsonl"))
+    env.pop("TT_DATA_DIR", None)
+    context = {"commit": git_commit(), "python": platform.python_version(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+               "clients": len(synth.read_manifest(corpus)), "snapshot": bool(snapshot_dir)}
+    results = []
+    try:
+        for page in STARTUP_PAGES:
+            cache_dir = tempfile.mkdtemp(prefix="tt-bench-cache-")
+            env["TT_CACHE_DIR"] = cache_dir
+            env["TT_SNAPSHOT_DIR"] = snapshot_dir or os.path.join(cache_dir, "no-snapshot")
+            start = time.perf_counter()
+            try:
+                child = subprocess.run(
+                    [sys.executable, "-c", _STARTUP, page, str(repeat)], cwd=os.path.dirname(os.path.abspath(__file__)),
+                    env=env, capture_output=True, text=True,
+                )
+            finally:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            if child.returncode:
+                raise RuntimeError(f"{page} failed:\n{child.stderr[-2000:]}")
+            result = {"benchmark": f"startup:{page}", "cold_s": time.perf_counter() - start, **json.loads(child.stdout.splitlines()[-1]), **context}
+            results.append(result)
+            log(f"{result['benchmark']:<42} cold {result['cold_s']:8.3f}s  imports {result['shell_import_s'] + result['page_import_s']:6.3f}s  "
+                f"first {result['first_render_s']:6.3f}s  rerun {result['median_s']:6.3f}s")
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(results, baseline_path, threshold, log=print):
+    # Median time and peak memory (startup: cold start and rerun time) against
+    # the last result per benchmark in a previous run; returns the names that
+    # regressed past the threshold
+    baseline = {}
+    with open(baseline_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                baseline[record["benchmark"]] = record
+    regressed = []
+    for result in results:
+        old = baseline.get(result["benchmark"])
+        if old is None:
+            continue
+        startup_run = result["benchmark"].startswith("startup:")
+        metrics = STARTUP_METRICS if startup_run else METRICS
+        ratios = []
+        for label, key in metrics:
+            # Older records, or a startup run with --repeat 0, may not have every metric
+            if result.get(key) is None or old.get(key) is None:
+                continue
+            ratios.append((label, result[key] / old[key] if old[key] else float("inf")))
+        flag = ""
+        if any(ratio > threshold for _, ratio in ratios):
+            regressed.append(result["benchmark"])
+            flag = "  REGRESSION"
+        log(f"{result['benchmark']:<42} " + "  ".join(f"{label} x{ratio:6.2f}" for label, ratio in ratios) + flag)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard computations on a synthetic corpus")
+    parser.add_argument("--corpus", help="existing synth.py corpus (default: generate one in a temp directory)")
+    parser.add_argument("--clients", type=int, default=1000, help="clients to generate")
+    parser.add_argument("--log-rows", type=int, default=100000, help="log rows to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snapshot", action="store_true", help="ingest the corpus and benchmark against the snapshot")
+    parser.add_argument("--repeat", type=int, default=5, help="warm runs per computation")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run just these computations")
+    parser.add_argument("--client", help="client to benchmark (default: the one with the most log rows)")
+    parser.add_argument("--out", help="append JSON results to this file instead of printing them")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio reported as a regression")
+    parser.add_argument("--startup", action="store_true", help="measure page cold start and rerun time instead")
+    args = parser.parse_args(argv)
+
+    log = functools.partial(print, file=sys.stderr)
+    workdir = tempfile.mkdtemp(prefix="tt-bench-")
+    corpus = args.corpus
+    try:
+        if corpus is None:
+            corpus = os.path.join(workdir, "corpus")
+            synth.generate(corpus, args.clients, args.log_rows, seed=args.seed, log=log)
+        snapshot_dir = None
+        if args.snapshot:
+            snapshot_dir = os.path.join(workdir, "snapshot")
+            os.makedirs(snapshot_dir)
+            # snapshot reads its root at import time, and ingest imports it
+            os.environ["TT_SNAPSHOT_DIR"] = snapshot_dir
+            import ingest
+            ingest.build(corpus, snapshot_dir, log=lambda message: None)
+        if args.startup:
+            results = startup(corpus, args.repeat, snapshot_dir, log)
+        else:
+            results = run(corpus, args.repeat, args.only, args.client, snapshot_dir, log)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    lines = "".join(json.dumps(result) + "\n" for result in results)
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+    if args.compare and compare(results, args.compare, args.threshold, log):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
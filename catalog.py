@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import threading
+
+
+# Client catalog. clients.jsonl holds one record per client: display name,
+# Patient.ID, the files holding the client's data, and any other spellings the
+# name appears under in the exports. Every client is filed under a canonical
+# key (the name lowercased, spaces and punctuation dropped), so "Courtney Bird "
+# in storage.csv and "Lambert Medicine Traveller.csv" resolve to the same
+# record. Lookups by name, key or Patient.ID are dict hits.
+#
+# Each client's data is loaded into its bundle on first access and kept there
+# until the source file's version changes.
+#
+#   {"name": "David Thok (Kuany)", "patient_id": 74545, "log": "David Thok (Kuany).csv",
+#    "timeline": "David Thok (Kuany).json", "sleep": "david.csv"}
+#
+# Adding a client is a new line in clients.jsonl (TT_CATALOG points elsewhere).
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clients.jsonl")
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def client_key(name):
+    return _NON_ALNUM.sub("", str(name)).lower()
+
+
+class Client:
+    __slots__ = ("key", "name", "patient_id", "log", "timeline", "sleep", "aliases")
+
+    def __init__(self, name, patient_id=None, log=None, timeline=None, sleep=None, aliases=()):
+        self.key = client_key(name)
+        self.name = name
+        self.patient_id = patient_id
+        self.log = log or f"{name}.csv"
+        self.timeline = timeline or f"{name}.json"
+        self.sleep = sleep
+        self.aliases = tuple(aliases)
+
+    def record(self):
+        record = {"name": self.name, "patient_id": self.patient_id, "log": self.log, "timeline": self.timeline, "sleep": self.sleep}
+        if self.aliases:
+            record["aliases"] = list(self.aliases)
+        return {k: v for k, v in record.items() if v is not None}
+
+    def __repr__(self):
+        return f"Client({self.name!r})"
+
+
+class Bundle:
+    # One client's data: each part is loaded on first use and reloaded only
+    # when the version of the file it came from changes
+
+    def __init__(self, client):
+        self.client = client
+        self._parts = {}
+        self._lock = threading.Lock()
+
+    def get(self, part, version, load):
+        with self._lock:
+            cached = self._parts.get(part)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        value = load()
+        with self._lock:
+            self._parts[part] = (version, value)
+        return value
+
+
+class Catalog:
+
+    def __init__(self, clients):
+        self.clients = list(clients)
+        self._by_key = {}
+        self._by_patient_id = {}
+        for client in self.clients:
+            self._by_key[client.key] = client
+            for alias in client.aliases:
+                self._by_key.setdefault(client_key(alias), client)
+            if client.patient_id is not None:
+                self._by_patient_id[client.patient_id] = client
+        self._bundles = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(Client(**json.loads(line)) for line in f if line.strip())
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for client in self.clients:
+                f.write(json.dumps(client.record(), ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+
+    def __iter__(self):
+        return iter(self.clients)
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __contains__(self, name):
+        return client_key(name) in self._by_key
+
+    def get(self, name):
+        # Client for any spelling of its name, or None
+        return self._by_key.get(client_key(name))
+
+    def __getitem__(self, name):
+        client = self.get(name)
+        if client is None:
+            raise KeyError(name)
+        return client
+
+    def by_patient_id(self, patient_id):
+        return self._by_patient_id.get(patient_id)
+
+    @property
+    def names(self):
+        return [client.name for client in self.clients]
+
+    def bundle(self, name):
+        client = self[name]
+        with self._lock:
+            bundle = self._bundles.get(client.key)
+            if bundle is None:
+                bundle = self._bundles[client.key] = Bundle(client)
+            return bundle
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    # Process-wide catalog, read from TT_CATALOG (default CATALOG_FILE) on first use
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = Catalog.load(os.environ.get("TT_CATALOG") or CATALOG_FILE)
+        return _catalog
@@ -0,0 +1,539 @@
+import os
+import threading
+from io import StringIO
+from urllib.parse import unquote
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import schema
+import snapshot
+import stream
+import tracing
+from catalog import client_key, get_catalog
+from data_cache import data_url, get_cache
+from figure_cache import get_cache as get_figure_cache
+from frame_cache import get_cache as get_frame_cache
+from housing import HousingIntervals
+from rollups import MONTH, VisitRollups, get_rollups, reset as reset_rollups
+from sleep import SleepCube, get_cube as get_sleep_cube
+from stream import get_feed
+from term_index import INDEX_FILE as TERMS_FILE, get_index as get_term_index
+from timeline_index import EventIndex, get_index as get_timeline_index
+
+
+# Data loading and chart builders behind the dashboard pages. Nothing here
+# touches streamlit, so the same functions serve the app, the benchmark
+# harness (bench.py) and anything else that needs the figures headless.
+#
+# Records from the append feed (stream.py) are merged in at read time: the
+# aggregate over each source file is kept per source version and the streamed
+# deltas are added on top, so a new record never re-reads the file.
+
+
+def fetch_csv_from_url(url):
+    # Served from the shared data cache; only revalidates with the origin once the TTL expires
+    return get_cache().get_text(url)
+
+
+def load_frame(url):
+    # Typed columns from the ingest snapshot when one exists, otherwise the CSV through the data cache.
+    # The frame is shared by every session through the frame cache: derive from it, never modify it
+    name = unquote(url.rsplit('/', 1)[-1])
+    with tracing.span('parse', file=name) as span:
+        def parse():
+            df = snapshot.load_table(name)
+            if df is None:
+                df = pd.read_csv(StringIO(fetch_csv_from_url(url)))
+                df = schema.coerce(df, schema.classify(name, df.columns))
+                span.set(source='csv')
+            else:
+                span.set(source='snapshot')
+            return df
+
+        df = get_frame_cache().get((name, source_version(url)), parse)
+        span.set(rows=len(df))
+    return df
+
+
+_rerun = threading.local()
+
+
+def begin_rerun():
+    # Called by each page before it builds anything (through prefetch_page): from here until the
+    # next call on this thread, source_version() checks each file once. Outside a page rerun
+    # (export, bench) nothing is memoised.
+    _rerun.versions = {}
+
+
+def source_version(url):
+    # Content identity of a source file: its snapshot hash, or the cached copy's ETag/digest
+    versions = getattr(_rerun, 'versions', None)
+    if versions is not None and url in versions:
+        return versions[url]
+    name = unquote(url.rsplit('/', 1)[-1])
+    manifest = snapshot.read_manifest()
+    if manifest is not None and name in manifest['tables']:
+        version = manifest['tables'][name]['sha256']
+    else:
+        version = get_cache().version(url)
+    if versions is not None:
+        versions[url] = version
+    return version
+
+
+# Source files whose derived state the feed updates, and the record type that does it;
+# sleep files are SLEEP and any other CSV is a client log
+STREAM_SOURCES = {
+    'housed_date.csv': stream.HOUSING,
+    'bar_stack.csv': stream.VISIT,
+    'storage.csv': stream.STORAGE,
+    'logs.csv': stream.LOG_COUNT,
+}
+
+
+_sleep_urls = (None, frozenset())
+
+
+def sleep_urls():
+    # Sleep file urls of the current catalog, collected once per catalog
+    global _sleep_urls
+    catalog = get_catalog()
+    if _sleep_urls[0] is not catalog:
+        _sleep_urls = (catalog, frozenset(data_url(client.sleep) for client in catalog if client.sleep))
+    return _sleep_urls[1]
+
+
+def stream_kind(url):
+    if url in sleep_urls():
+        return stream.SLEEP
+    name = unquote(url.rsplit('/', 1)[-1])
+    return STREAM_SOURCES.get(name, stream.LOG if name.endswith('.csv') else None)
+
+
+def stream_since(url):
+    # Journal position of the first streamed record for url that its current version doesn't hold
+    return get_feed().watermark(stream_kind(url), url, source_version(url))
+
+
+_aggregates = {}
+
+
+def base_aggregate(kind, url, build):
+    # Aggregate over one source file, rebuilt only when the file's version changes
+    version = source_version(url)
+    cached = _aggregates.get(kind)
+    if cached is None or cached[0] != version:
+        cached = _aggregates[kind] = (version, build(load_frame(url)))
+    return cached[1]
+
+
+def reset():
+    # Drop the memoized aggregates so the next read rebuilds them from the source files
+    _aggregates.clear()
+    reset_rollups()
+
+
+def client_rows(url, client):
+    # A client's rows of a per-client table (storage.csv, logs.csv): the file's rows are
+    # indexed by client key once per version, and each client's slice kept in its bundle
+    name = unquote(url.rsplit('/', 1)[-1])
+
+    def index(df):
+        return df, df.groupby(df['Client'].astype(str).map(client_key).to_numpy()).indices
+
+    def load():
+        df, rows = base_aggregate(name, url, index)
+        return df.iloc[rows.get(client.key, [])]
+
+    return get_catalog().bundle(client.key).get(name, source_version(url), load)
+
+
+def load_housing_intervals():
+    # Every housing range exploded and parsed in one batch, plus the streamed periods; every
+    # spelling of a client is filed under the catalog's name
+    def build(data):
+        return HousingIntervals.from_frame(data.assign(client=data['client'].map(canonical_name)))
+
+    url = data_url('housed_date.csv')
+    intervals = base_aggregate('housing', url, build)
+    get_feed().replay(intervals, stream.HOUSING, lambda r: intervals.add(canonical_name(r['client']), r['start'], r['end']), stream_since(url))
+    return intervals
+
+
+def plot_housing_periods():
+    with tracing.span('aggregate', chart='housing'):
+        intervals = load_housing_intervals()
+        parsed_df = intervals.frame()
+        total_days_housed = intervals.total_days().to_dict()
+
+    # Plotting
+    with tracing.span('figure', chart='housing'):
+        fig = px.timeline(parsed_df, x_start="Start", x_end="End", y="Client", color="Client", title="Housing Periods")
+        fig.update_yaxes(categoryorder="total ascending")
+    return fig, total_days_housed
+
+
+def plot_housing_occupancy(start=None, end=None):
+    # Clients housed on each day, from a sweep over the merged housing periods
+    with tracing.span('aggregate', chart='housing_occupancy'):
+        occupancy = load_housing_intervals().occupancy(start, end).reset_index()
+
+    with tracing.span('figure', chart='housing_occupancy'):
+        fig = px.area(occupancy, x='Date', y='Housed', title='Clients Housed per Day',
+                      labels={'Housed': 'Clients Housed'}, line_shape='hv')
+    return fig
+
+
+def housing_gaps():
+    # Stretches between each client's housing periods, and periods that overlap an earlier one
+    with tracing.span('aggregate', chart='housing_gaps'):
+        intervals = load_housing_intervals()
+        return intervals.gaps(), intervals.overlaps()
+
+
+def load_visit_rollups(csv_path):
+    # Program-usage rollups of bar_stack.csv, rebuilt only when the file changes, plus the streamed visits
+    with tracing.span('aggregate', chart='visit_rollups'):
+        rollups = get_rollups(source_version(csv_path), lambda: VisitRollups.from_frame(load_frame(csv_path)))
+        get_feed().replay(rollups, stream.VISIT, lambda r: rollups.add(r['patient_id'], r['reason'], r['visits'], r['date']), stream_since(csv_path))
+    return rollups
+
+
+def visit_totals(csv_path):
+    # Visits per (Patient.ID, Reason), all time
+    return load_visit_rollups(csv_path).query(('Patient.ID', 'Reason'))
+
+
+def plot_visits_from_csv(csv_path, programs=None, start=None, end=None):
+    with tracing.span('aggregate', chart='visits'):
+        # Total visits for each reason, from the rollups, optionally for some programs or dates
+        grouped_data = load_visit_rollups(csv_path).query(('Reason',), programs=programs, start=start, end=end).reset_index()
+
+    # Create a bar chart using Plotly with different colors for each reason
+    with tracing.span('figure', chart='visits'):
+        fig = px.bar(grouped_data, 
+                     x='Reason', 
+                     y='Visits', 
+                     title='Programs Over Number Accessed Chart', 
+                     color='Reason',
+                     labels={'Reason': 'Programs', 'Visits': 'Number Accessed'},
+                     height=600,
+                     width=900)
+
+    return fig
+
+
+def plot_program_trend(csv_path, program=None, granularity=MONTH, start=None, end=None):
+    # Visits per month or week for one program (or every program), from the dated rollups
+    with tracing.span('aggregate', chart='program_trend'):
+        programs = [program] if program else None
+        trend = load_visit_rollups(csv_path).query(('Date',), programs=programs, start=start, end=end, granularity=granularity).reset_index()
+
+    with tracing.span('figure', chart='program_trend'):
+        fig = px.line(trend,
+                      x='Date',
+                      y='Visits',
+                      markers=True,
+                      title=f"{program or 'All Programs'} Visits per {granularity.title()}",
+                      labels={'Date': granularity.title(), 'Visits': 'Number Accessed'},
+                      height=450)
+
+    return fig
+
+
+def plot_radar_chart_for_patient(patient_id, data):
+
+    # Filter data for the selected patient
+    patient_data = data[data['Client'] == patient_id]
+
+    # Create the radar chart
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatterpolar(
+        r=patient_data['Visits'],
+        theta=patient_data['Reason'],
+        fill='toself',
+        name='Number of Visits'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, patient_data['Visits'].max() + 2]
+            )),
+        showlegend=True
+    )
+
+    return fig
+
+
+def generate_patient_visits_radar(csv_path, selected_client_name):
+    client = get_catalog()[selected_client_name]
+
+    with tracing.span('aggregate', chart='radar'):
+        # The client's all-time visits per reason, from the rollups
+        visits = load_visit_rollups(csv_path).query(('Reason',), clients=[client.patient_id])
+        client_grouped_data = visits.reset_index().assign(Client=client.name)
+
+    # Generate the radar chart for the selected client name
+    with tracing.span('figure', chart='radar'):
+        fig = plot_radar_chart_for_patient(client.name, client_grouped_data)
+
+    return fig
+
+
+def generate_service_usage_pie_chart(selected_client):
+    client = get_catalog()[selected_client]
+
+    with tracing.span('aggregate', chart='storage_pie'):
+        # The selected client's rows
+        url = data_url('storage.csv')
+        client_data = client_rows(url, client)
+
+        # Sum the usage of each service for the selected client, plus what was streamed since
+        service_totals = client_data.sum(numeric_only=True)
+        streamed = get_feed().storage(selected_client, stream_since(url))
+        if streamed:
+            service_totals = service_totals.add(pd.Series(streamed), fill_value=0)
+
+    # Create the pie chart
+    with tracing.span('figure', chart='storage_pie'):
+        fig = px.pie(data_frame=service_totals, names=service_totals.index, values=service_totals.values, hole=0.3, title=f"Storage Usage of {client.name}")
+
+    return fig
+
+
+def generate_service_usage_stacked_bar_chart(selected_client):
+    client = get_catalog()[selected_client]
+
+    with tracing.span('aggregate', chart='logs_bar'):
+        # The selected client's rows
+        url = data_url('logs.csv')
+        client_data = client_rows(url, client)
+
+        # Pivot the data to have services as columns, clients as rows, and usage as values
+        client_data_pivot = client_data.assign(Client=client.name).melt(id_vars=['Client'], var_name='Service', value_name='Usage')
+
+        # Streamed counts stack on top of the file's
+        streamed = get_feed().log_counts(selected_client, stream_since(url))
+        if streamed:
+            client_data_pivot = pd.concat([client_data_pivot, pd.DataFrame({
+                'Client': client.name, 'Service': list(streamed), 'Usage': list(streamed.values()),
+            })], ignore_index=True)
+
+    # Create the stacked bar chart
+    with tracing.span('figure', chart='logs_bar'):
+        fig = px.bar(client_data_pivot, x='Client', y='Usage', color='Service', title=f"Bars and Logs Data for {client.name}")
+
+    return fig
+
+
+def cohort_clients(names=None):
+    # Catalog clients of a cohort selection; None selects every client
+    catalog = get_catalog()
+    return list(catalog) if names is None else [catalog[name] for name in names]
+
+
+def visits_matrix(csv_path):
+    # Visits per (client, reason) for every client at once: one pivot of the indexed totals
+    catalog = get_catalog()
+    matrix = visit_totals(csv_path).unstack('Reason', fill_value=0)
+    clients = [catalog.by_patient_id(patient_id) for patient_id in matrix.index]
+    names = pd.Index([client.name if client is not None else None for client in clients], name='Client')
+    matrix.columns = matrix.columns.astype(str)
+    return matrix.set_axis(names, axis=0)[names.notna()].groupby(level='Client', sort=False).sum()
+
+
+def storage_matrix():
+    # Items per (client key, service) for every client, plus the streamed counts
+    def build(data):
+        return data.groupby(data['Client'].astype(str).map(client_key).to_numpy()).sum(numeric_only=True)
+
+    url = data_url('storage.csv')
+    matrix = base_aggregate('storage_matrix', url, build)
+    streamed = get_feed().storage_totals(stream_since(url))
+    if streamed:
+        matrix = matrix.add(pd.DataFrame.from_dict(streamed, orient='index'), fill_value=0)
+    return matrix
+
+
+def generate_cohort_radar(csv_path, names=None):
+    # One radar trace per client of the cohort, overlaid on shared axes
+    clients = cohort_clients(names)
+    with tracing.span('aggregate', chart='cohort_radar'):
+        matrix = visits_matrix(csv_path).reindex([client.name for client in clients]).dropna(how='all')
+
+    with tracing.span('figure', chart='cohort_radar'):
+        fig = go.Figure()
+        theta = list(matrix.columns)
+        for name, row in zip(matrix.index, matrix.to_numpy()):
+            fig.add_trace(go.Scatterpolar(r=row, theta=theta, fill='toself', name=name, opacity=0.6))
+        fig.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[0, (matrix.to_numpy().max() if matrix.size else 0) + 2])),
+            showlegend=True,
+            title='Programs Accessed by Client',
+        )
+    return fig
+
+
+def plot_program_matrix(csv_path, names=None):
+    # Client x program heatmap of visits
+    clients = cohort_clients(names)
+    with tracing.span('aggregate', chart='program_matrix'):
+        matrix = visits_matrix(csv_path).reindex([client.name for client in clients]).dropna(how='all')
+
+    with tracing.span('figure', chart='program_matrix'):
+        return px.imshow(matrix, labels={'x': 'Programs', 'y': 'Client', 'color': 'Number Accessed'},
+                         aspect='auto', color_continuous_scale='Blues', title='Program Usage Matrix')
+
+
+def generate_cohort_storage_chart(names=None):
+    # Each client's storage breakdown as a stacked bar, side by side
+    clients = cohort_clients(names)
+    with tracing.span('aggregate', chart='cohort_storage'):
+        matrix = storage_matrix().reindex([client.key for client in clients]).set_axis([client.name for client in clients], axis=0)
+        usage = matrix.dropna(how='all').rename_axis('Client').reset_index().melt(id_vars='Client', var_name='Service', value_name='Usage')
+
+    with tracing.span('figure', chart='cohort_storage'):
+        return px.bar(usage, x='Client', y='Usage', color='Service', title='Storage Usage by Client')
+
+
+def plot_nightly_beds():
+    cube = load_sleep_cube()
+    with tracing.span('aggregate', chart='nightly_beds'):
+        beds = pd.concat([cube.nightly_beds(), cube.day_sleepers()], axis=1).reset_index()
+    with tracing.span('figure', chart='nightly_beds'):
+        return px.line(beds, x='Date', y=['Night Beds', 'Day Sleep'], title='Nightly Bed Count')
+
+
+def plot_floor_utilisation():
+    cube = load_sleep_cube()
+    with tracing.span('aggregate', chart='floor_utilisation'):
+        floors = cube.floor_utilisation().reset_index().melt(id_vars='Date', var_name='Floor', value_name='Check-ins')
+    with tracing.span('figure', chart='floor_utilisation'):
+        return px.area(floors, x='Date', y='Check-ins', color='Floor', title='Check-ins per Floor')
+
+
+def generate_word_treemap(csv_path):
+    # Word counts come from the process-wide term index; a client's log is only
+    # tokenized the first time it is viewed or when its content changes
+    name = unquote(csv_path.rsplit('/', 1)[-1])
+    index = get_term_index(os.path.join(snapshot.SNAPSHOT_DIR, TERMS_FILE))
+    version = source_version(csv_path)
+    with tracing.span('aggregate', chart='word_treemap') as span:
+        span.set(new_rows=index.sync(name[:-len('.csv')], version, lambda: load_frame(csv_path)))
+        get_feed().replay(index, stream.LOG, lambda r: index.add(log_name(r['client']), r['text'], r['start_date'], r['log']))
+
+        # Top 50 words by frequency
+        top_50_words = index.top(name[:-len('.csv')], 50)
+
+    # Extract words and their counts for the treemap
+    top_words = [word[0] for word in top_50_words]
+    top_counts = [word[1] for word in top_50_words]
+
+    # Create a treemap using plotly for the top 50 words
+    with tracing.span('figure', chart='word_treemap'):
+        fig = px.treemap(names=top_words, path=[top_words], values=top_counts, title= "Frequent Fifty Words In Log")
+
+    return fig
+
+
+def fetch_json_from_url(url):
+    return get_cache().get_json(url)
+
+
+def load_timeline(url):
+    # Event index for a client's timeline: the snapshot table when one exists, else the parsed JSON
+    name = unquote(url.rsplit('/', 1)[-1])
+
+    def build():
+        with tracing.span('parse', file=name) as span:
+            table = snapshot.open_table(name)
+            index = EventIndex.from_table(table) if table is not None else EventIndex.from_json(fetch_json_from_url(url))
+            span.set(source='json' if table is None else 'snapshot', rows=len(index))
+            return index
+
+    return get_timeline_index(name, source_version(url), build)
+
+
+def cached_chart(kind, client, sources, build):
+    # Built figure spec keyed by chart, client and the versions of its source files (and of
+    # the streamed records for them), so layout-only reruns and changes to other widgets on
+    # the page skip the rebuild
+    with tracing.span('chart', chart=kind, client=client):
+        feed = get_feed()
+        key = (kind, client) + tuple(source_version(url) for url in sources)
+        key += tuple(sorted({(k, feed.version(k)) for k in map(stream_kind, sources) if k}))
+        return get_figure_cache().get(key, build)
+
+
+def canonical_name(name):
+    # The catalog's spelling of a client name; names not in the catalog are kept as given
+    client = get_catalog().get(name)
+    return client.name if client is not None else name
+
+
+def log_name(name):
+    # The term-index key of a client's log (its log file's name without .csv), for any
+    # spelling of the client or of the file; names not in the catalog are kept as given
+    client = get_catalog().get(name)
+    return client.log[:-len('.csv')] if client is not None else name
+
+
+def sleep_sources():
+    # {client name: sleep check-in CSV url} for every catalog client with a sleep file
+    return {client.name: data_url(client.sleep) for client in get_catalog() if client.sleep}
+
+
+def load_sleep_cube():
+    # Day/night occupancy for every client in one cube; rebuilt only when a sleep file changes
+    with tracing.span('aggregate', chart='sleep_cube'):
+        sources = sleep_sources()
+        versions = {client: source_version(url) for client, url in sources.items()}
+        cube = get_sleep_cube(versions, lambda client: load_frame(sources[client]))
+        # Each client's check-ins count from the watermark of their own sleep file
+        since = {client: stream_since(url) for client, url in sources.items()}
+        get_feed().replay(cube, stream.SLEEP, lambda r: cube.add(canonical_name(r['client']), r['date'], r['program']),
+                          lambda r: since.get(canonical_name(r['client']), 0))
+        return cube
+
+
+def load_client_sleep_cube(name):
+    # One client's check-ins as a cube of their own, kept in the client's bundle, so a calendar
+    # reads one sleep file rather than every client's
+    client = get_catalog()[name]
+    url = data_url(client.sleep)
+    cube = get_catalog().bundle(client.name).get('sleep', source_version(url), lambda: SleepCube.build({client.name: load_frame(url)}))
+
+    def add(record):
+        if canonical_name(record['client']) == client.name:
+            cube.add(client.name, record['date'], record['program'])
+
+    get_feed().replay(cube, stream.SLEEP, add, stream_since(url))
+    return cube
+
+
+def plot_sleep_calendar(client):
+    # Calendar values for the client are a slice of their own sleep cube
+    with tracing.span('aggregate', chart='sleep_calendar'):
+        cube = load_client_sleep_cube(client)
+        df_agg = cube.calendar(get_catalog()[client].name)
+
+    # Create a calplot figure; plotly_calplot is only imported by the pages that draw one
+    from plotly_calplot import calplot
+    with tracing.span('figure', chart='sleep_calendar'):
+        return calplot(
+            df_agg,
+            x="Sleep",
+            y="value",
+            dark_theme=True,
+            years_title=True,
+            gap=2,
+            name="Sleep",
+            colorscale=[[0, '#2596BE'], [0.5, '#FFE0B3'], [1, '#FF9800']],
+            month_lines_width=2,
+            month_lines_color="#fff"
+        )
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from catalog import get_catalog
+from charts import cached_chart, generate_cohort_radar, generate_cohort_storage_chart, plot_program_matrix
+from data_cache import data_url
+from figure_cache import render
+from page_tools import prefetch_page
+
+
+# "Cohort Comparison" page: any set of clients, or all of them, side by side.
+
+
+def show():
+
+    st.title("Cohort Comparison")
+
+    catalog = get_catalog()
+    csv_path = data_url('bar_stack.csv')
+    prefetch_page([csv_path, data_url('storage.csv')])
+
+    # Every chart below comes from one grouped computation over all clients, sliced to the cohort
+    if st.checkbox('All clients', value=True):
+        cohort = None
+    else:
+        cohort = st.multiselect('Clients', catalog.names, default=catalog.names[:3])
+        if not cohort:
+            st.info("Select one or more clients to compare.")
+            return
+        cohort = tuple(cohort)
+
+    col1, col2 = st.columns(2)
+    col1.plotly_chart(render(cached_chart('cohort_radar', cohort, [csv_path], lambda: generate_cohort_radar(csv_path, cohort))), use_container_width=True)
+    col2.plotly_chart(render(cached_chart('cohort_storage', cohort, [data_url('storage.csv')], lambda: generate_cohort_storage_chart(cohort))), use_container_width=True)
+
+    matrix_height = st.slider('Select Matrix Height', 300, 1500, 500)
+    st.plotly_chart(render(cached_chart('program_matrix', cohort, [csv_path], lambda: plot_program_matrix(csv_path, cohort)), height=matrix_height), use_container_width=True)
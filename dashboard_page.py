@@ -0,0 +1,126 @@
+import pandas as pd
+import streamlit as st
+
+from catalog import get_catalog
+from charts import (
+    cached_chart, housing_gaps, load_frame, load_visit_rollups, sleep_sources, generate_patient_visits_radar,
+    generate_service_usage_pie_chart, generate_service_usage_stacked_bar_chart, plot_floor_utilisation,
+    plot_housing_occupancy, plot_housing_periods, plot_nightly_beds, plot_program_trend, plot_visits_from_csv,
+)
+from data_cache import data_url
+from figure_cache import render
+from page_tools import prefetch_page
+from rollups import MONTH, WEEK
+
+
+# "Client Dashboard" page: housing periods, occupancy and gaps, program visits
+# (filtered by program and date, with a per-program trend), storage and log
+# counts per client, and agency-wide shelter occupancy.
+
+
+def show():
+
+    st.title("Client Dashboard")
+
+    catalog = get_catalog()
+    csv_path = data_url('bar_stack.csv')
+    prefetch_page([data_url('housed_date.csv'), csv_path, data_url('storage.csv'), data_url('logs.csv')] + list(sleep_sources().values()))
+
+    housing_spec, total_days_housed = cached_chart('housing', None, [data_url('housed_date.csv')], plot_housing_periods)
+
+    # Adjusting the figure size using the sidebar slider values; only the layout of the cached figure changes
+    chart_width = st.sidebar.slider("Select Housing Chart Width", 300, 1000, 800)
+    chart_height = st.sidebar.slider("Select Housing Chart Height", 300, 800, 450)
+    fig = render(housing_spec, autosize=True, paper_bgcolor= "#262730", plot_bgcolor="#262730", width=chart_width, height=chart_height)
+
+    # Determine the ratio of the Gantt chart width to the total page width
+    total_page_width = 1500  # Assuming a typical total page width, adjust as needed
+    chart_ratio = chart_width / total_page_width
+    table_ratio = 1 - chart_ratio
+
+    # Create two columns: one for the Gantt chart and one for the table
+    col1, col2 = st.columns([0.8, 0.2])
+
+    # Display the Gantt chart in the left column
+    col1.plotly_chart(fig, use_container_width= True)
+    
+    # Create a DataFrame from total_days_housed and display it as a table in the right column
+    df_total_days = pd.DataFrame.from_dict(total_days_housed, orient='index', columns=['Total Days Housed']).reset_index()
+    df_total_days.columns = ['Client', 'Total Days Housed']
+    col2.write(df_total_days, use_container_width= True)
+
+    # Clients housed per day, and the gaps and overlaps in each client's housing history
+    occupancy_spec = cached_chart('housing_occupancy', None, [data_url('housed_date.csv')], plot_housing_occupancy)
+    st.plotly_chart(render(occupancy_spec, height=350), use_container_width=True)
+    gaps, overlaps = housing_gaps()
+    with st.expander(f"Housing gaps ({len(gaps)}) and overlapping periods ({len(overlaps)})"):
+        col_gaps, col_overlaps = st.columns(2)
+        col_gaps.write("Time unhoused between periods")
+        col_gaps.dataframe(gaps, hide_index=True, use_container_width=True)
+        col_overlaps.write("Periods starting before an earlier one ended")
+        col_overlaps.dataframe(overlaps, hide_index=True, use_container_width=True)
+
+   # Create two columns: one for the bar plot and one for the radar chart
+    col3, col4 = st.columns([chart_ratio, table_ratio])
+
+    # Program and date filters, answered from the visit rollups; dates only when some visits are dated
+    rollups = load_visit_rollups(csv_path)
+    programs = tuple(col3.multiselect('Programs:', rollups.programs, placeholder='All programs'))
+    start = end = None
+    date_range = rollups.date_range()
+    if date_range:
+        start, end = col3.slider('Visit Dates:', min_value=date_range[0], max_value=date_range[1], value=date_range)
+        if (start, end) == date_range:
+            start = end = None
+
+    # Display the bar plot in the first column
+    visits_by_reason_chart = render(cached_chart('visits', (programs, start, end), [csv_path], lambda: plot_visits_from_csv(csv_path, programs or None, start, end)))
+    col3.plotly_chart(visits_by_reason_chart, use_container_width=True)
+
+    # Create the selectbox in the second column
+    data = load_frame(csv_path)
+    cleaned_data = data.dropna(subset=['Reason', 'Visits'])
+    clients = [catalog.by_patient_id(patient_id) for patient_id in cleaned_data['Patient.ID'].unique()]
+    client_names = [client.name for client in clients if client is not None]
+    selected_client_name = col4.selectbox('Select Client:', client_names)
+
+
+    radar_spec = cached_chart('radar', selected_client_name, [csv_path], lambda: generate_patient_visits_radar(csv_path, selected_client_name))
+    col4.plotly_chart(render(radar_spec), use_container_width=True)
+
+    # Drill down from the program totals to one program's monthly or weekly trend
+    st.write("## Program Trend")
+    if date_range:
+        col_trend, col_options = st.columns([0.8, 0.2])
+        trend_program = col_options.selectbox('Program:', ['All programs'] + rollups.programs)
+        trend_program = None if trend_program == 'All programs' else trend_program
+        granularity = col_options.radio('Per:', [MONTH, WEEK], format_func=str.title)
+        trend_spec = cached_chart('program_trend', (trend_program, granularity, start, end), [csv_path], lambda: plot_program_trend(csv_path, trend_program, granularity, start, end))
+        col_trend.plotly_chart(render(trend_spec), use_container_width=True)
+    else:
+        st.caption("bar_stack.csv holds whole-history totals; trends appear once dated visits arrive on the feed.")
+    # Column creation
+    col5, col6 = st.columns([chart_ratio, table_ratio])
+
+    # Create the select box in col5
+    data = load_frame(data_url('storage.csv'))
+    
+    client_options = list(dict.fromkeys(catalog[name].name for name in data['Client'].unique() if name in catalog))
+    selected_client_for_pie = col5.selectbox('Select Client :', client_options)
+
+    # Generate and display the pie chart below the select box in col5
+    pie_chart = render(cached_chart('storage_pie', selected_client_for_pie, [data_url('storage.csv')], lambda: generate_service_usage_pie_chart(selected_client_for_pie)))
+    col5.plotly_chart(pie_chart, use_container_width=True)
+
+    # Col6 stacked bar plot
+    selected_client_for_bar = col6.selectbox('Select Client:', client_options)
+    bar_chart = render(cached_chart('logs_bar', selected_client_for_bar, [data_url('logs.csv')], lambda: generate_service_usage_stacked_bar_chart(selected_client_for_bar)))
+    col6.plotly_chart(bar_chart, use_container_width=True)
+
+    # Agency-wide occupancy, sliced from the same sleep cube as the client calendars
+    st.markdown('---')
+    st.write("## Shelter Occupancy")
+    col7, col8 = st.columns(2)
+    sleep_urls = list(sleep_sources().values())
+    col7.plotly_chart(render(cached_chart('nightly_beds', None, sleep_urls, plot_nightly_beds)), use_container_width=True)
+    col8.plotly_chart(render(cached_chart('floor_utilisation', None, sleep_urls, plot_floor_utilisation)), use_container_width=True)
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+
+import tracing
+
+
+# Where the dashboard data lives. TT_DATA_URL points the app at another origin
+# (a fork, a local stand-in server), TT_DATA_DIR serves the files straight off
+# disk with no network at all.
+BASE_URL = os.environ.get("TT_DATA_URL", "https://raw.githubusercontent.com/qawaki/tt/main").rstrip("/")
+
+
+def data_url(name):
+    return f"{BASE_URL}/{name}"
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "fetched_at", "stale", "digest")
+
+    def __init__(self, body, etag=None, last_modified=None, fetched_at=0.0, stale=False):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.stale = stale
+        self.digest = None
+
+
+class DataCache:
+    # Two-level cache keyed by URL: an in-memory LRU bounded by max_bytes in
+    # front of an on-disk store. Entries younger than ttl are served without
+    # touching the network; older ones are revalidated with ETag /
+    # If-Modified-Since, and if the origin is slow or down the last good copy
+    # is served instead of failing the page. After a failed revalidation that
+    # copy is served straight away for retry_after seconds, so a down origin
+    # costs one timeout per URL per window rather than one per read.
+
+    def __init__(self, cache_dir=None, ttl=300, max_bytes=64 * 1024 * 1024, timeout=10, local_dir=None, pool_size=16, retry_after=30):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.local_dir = local_dir
+        self.pool_size = pool_size
+        self._session = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # ---- public API -----------------------------------------------------
+
+    def get(self, url):
+        with tracing.span("fetch", url=url) as span:
+            body = self._get(url)
+            span.set(bytes=len(body))
+            return body
+
+    def _get(self, url):
+        if self.local_dir:
+            return self._get_local(url)
+
+        entry = self._lookup(url)
+        if entry is not None and time.time() - entry.fetched_at < self.ttl:
+            self.hits += 1
+            tracing.note(cache="hit")
+            return entry.body
+        if entry is not None and time.time() < self._retry_at.get(url, 0):
+            # The origin failed recently: keep serving the last good copy until the next attempt
+            self.stale_served += 1
+            tracing.note(cache="stale")
+            return entry.body
+        return self._revalidate(url, entry).body
+
+    def get_text(self, url):
+        return self.get(url).decode("utf-8")
+
+    def get_json(self, url):
+        return json.loads(self.get(url))
+
+    def version(self, url):
+        # Cheap identifier of the cached content, used to key derived results
+        entry = self._lookup(url)
+        if entry is None:
+            self.get(url)
+            entry = self._lookup(url)
+        if entry.etag:
+            return entry.etag
+        # Hashed once per entry; a new body arrives as a new entry
+        if entry.digest is None:
+            entry.digest = hashlib.sha1(entry.body).hexdigest()
+        return entry.digest
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_served": self.stale_served,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    # ---- network --------------------------------------------------------
+
+    @property
+    def session(self):
+        # One keep-alive connection pool shared by every fetch, including the
+        # concurrent ones issued by prefetch. requests is only imported once
+        # something is fetched over HTTP; local and snapshot reads never need it.
+        import requests
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def _revalidate(self, url, entry):
+        import requests
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                self._retry_at.pop(url, None)
+                self.hits += 1
+                tracing.note(cache="revalidated", transferred=0)
+                entry.fetched_at = time.time()
+                entry.stale = False
+                self._write_disk(url, entry)
+                return entry
+            response.raise_for_status()
+        except requests.RequestException:
+            if entry is None:
+                raise
+            # Origin is unavailable: keep the page working on the last good copy
+            with self._lock:
+                self._retry_at[url] = time.time() + self.retry_after
+            self.stale_served += 1
+            entry.stale = True
+            tracing.note(cache="stale")
+            return entry
+
+        self._retry_at.pop(url, None)
+        self.misses += 1
+        tracing.note(cache="miss", transferred=len(response.content))
+        entry = CacheEntry(
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        self._store(url, entry)
+        self._write_disk(url, entry)
+        return entry
+
+    def _get_local(self, url):
+        name = unquote(urlsplit(url).path.rsplit("/", 1)[-1])
+        path = os.path.join(self.local_dir, name)
+        mtime = os.stat(path).st_mtime
+
+        entry = self._lookup(url, disk=False)
+        if entry is not None and entry.fetched_at == mtime:
+            self.hits += 1
+            tracing.note(cache="hit")
+            return entry.body
+
+        self.misses += 1
+        tracing.note(cache="miss")
+        with open(path, "rb") as f:
+            entry = CacheEntry(f.read(), fetched_at=mtime)
+        self._store(url, entry)
+        return entry.body
+
+    # ---- memory tier ----------------------------------------------------
+
+    def _lookup(self, url, disk=True):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+        if disk:
+            entry = self._read_disk(url)
+            if entry is not None:
+                self._store(url, entry)
+        return entry
+
+    def _store(self, url, entry):
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._size -= len(old.body)
+            self._entries[url] = entry
+            self._size += len(entry.body)
+            # Evict least recently used entries once over budget; the disk
+            # copy stays behind so an evicted URL is still cheap to reload.
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    # ---- disk tier ------------------------------------------------------
+
+    def _disk_paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".body", base + ".meta"
+
+    def _read_disk(self, url):
+        if not self.cache_dir:
+            return None
+        body_path, meta_path = self._disk_paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(body, meta.get("etag"), meta.get("last_modified"), meta.get("fetched_at", 0.0))
+
+    def _write_disk(self, url, entry):
+        if not self.cache_dir:
+            return
+        body_path, meta_path = self._disk_paths(url)
+        meta = {"url": url, "etag": entry.etag, "last_modified": entry.last_modified, "fetched_at": entry.fetched_at}
+        try:
+            _atomic_write(body_path, entry.body)
+            _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError:
+            # A read-only or full disk only costs us persistence, not the page
+            pass
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    # One cache per process so every rerun and every session shares it
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DataCache(
+                cache_dir=os.environ.get("TT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tt-cache")),
+                ttl=float(os.environ.get("TT_CACHE_TTL", 300)),
+                max_bytes=int(float(os.environ.get("TT_CACHE_MAX_MB", 64)) * 1024 * 1024),
+                timeout=float(os.environ.get("TT_FETCH_TIMEOUT", 10)),
+                retry_after=float(os.environ.get("TT_FETCH_RETRY", 30)),
+                local_dir=os.environ.get("TT_DATA_DIR") or None,
+            )
+        return _cache
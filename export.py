@@ -0,0 +1,193 @@
+import argparse
+import html
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+import charts
+from catalog import get_catalog
+from data_cache import data_url
+from prefetch import prefetch, failed
+
+
+# Static HTML export of the dashboard and of every client's Journey Map, for
+# case conferences and funder reports. The figures come from the same chart
+# builders as the app, run without Streamlit:
+#
+#   dashboard.html      housing periods and occupancy, programs, shelter
+#                       occupancy, cohort storage
+#   <Client>.html       journey timeline, sleep calendar, word treemap and the
+#                       client's program radar, storage pie and log counts
+#   index.html          links to all of the above
+#   plotly.min.js       written once and shared by every report
+#
+# The data is fetched once into the shared data cache, then the reports are
+# built in a process pool, one client per task.
+#
+#   python export.py --out reports [--clients NAME ...] [--workers N]
+
+PLOTLY_JS = "plotly.min.js"
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 1200px; color: #222; }}
+h1 {{ border-bottom: 1px solid #ccc; }}
+.event {{ border-left: 3px solid #2596BE; margin: 0 0 1em; padding-left: 1em; }}
+.event time {{ color: #666; font-size: 0.9em; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ddd; padding: 0.3em 0.6em; text-align: left; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Exported {exported}</p>
+{body}
+</body>
+</html>
+"""
+
+
+def file_name(client):
+    # A client's report file; characters unsafe in file names are replaced
+    return re.sub(r'[\\/:*?"<>|]', "_", client) + ".html"
+
+
+def section(title, content):
+    return f"<h2>{html.escape(title)}</h2>\n{content}\n"
+
+
+def figure_html(fig, **layout):
+    if layout:
+        fig.update_layout(**layout)
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def write_page(path, title, body):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(_PAGE.format(title=html.escape(title), plotly_js=PLOTLY_JS, exported=time.strftime("%Y-%m-%d %H:%M"), body=body))
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def timeline_html(events):
+    # Every journey event, oldest first, as it reads in the timeline widget
+    data = events.payload(page_size=max(1, len(events)))
+    items = []
+    for event in data["events"]:
+        start = event.get("start_date", {})
+        date = "-".join(str(start[k]) for k in ("year", "month", "day") if k in start)
+        text = event.get("text", {})
+        items.append(
+            f'<div class="event"><time>{html.escape(date)}</time>'
+            f'<h3>{html.escape(str(text.get("headline", "")))}</h3>{text.get("text", "")}</div>'
+        )
+    return "\n".join(items) or "<p>No events.</p>"
+
+
+def export_dashboard(out):
+    visits_url = data_url("bar_stack.csv")
+    housing, total_days_housed = charts.plot_housing_periods()
+    totals = pd.DataFrame.from_dict(total_days_housed, orient="index", columns=["Total Days Housed"]).rename_axis("Client").reset_index()
+    body = "".join([
+        section("Housing Periods", figure_html(housing) + totals.to_html(index=False, border=0)),
+        section("Clients Housed per Day", figure_html(charts.plot_housing_occupancy())),
+        section("Programs", figure_html(charts.plot_visits_from_csv(visits_url))),
+        section("Program Usage by Client", figure_html(charts.plot_program_matrix(visits_url))),
+        section("Storage Usage by Client", figure_html(charts.generate_cohort_storage_chart())),
+        section("Shelter Occupancy", figure_html(charts.plot_nightly_beds()) + figure_html(charts.plot_floor_utilisation())),
+    ])
+    return write_page(os.path.join(out, "dashboard.html"), "Client Dashboard", body)
+
+
+def export_client(out, name):
+    client = get_catalog()[name]
+    visits_url = data_url("bar_stack.csv")
+    parts = [section("Client Journey Map Timeline", timeline_html(charts.load_timeline(data_url(client.timeline))))]
+    if client.sleep:
+        parts.append(section("Sleep Check-ins", figure_html(charts.plot_sleep_calendar(client.name), width=1000)))
+    parts.append(section("Word Treemap", figure_html(charts.generate_word_treemap(data_url(client.log)))))
+    if client.patient_id is not None:
+        parts.append(section("Programs Accessed", figure_html(charts.generate_patient_visits_radar(visits_url, client.name))))
+    parts.append(section("Storage Usage", figure_html(charts.generate_service_usage_pie_chart(client.name))))
+    parts.append(section("Bars and Logs", figure_html(charts.generate_service_usage_stacked_bar_chart(client.name))))
+    return write_page(os.path.join(out, file_name(client.name)), client.name, "".join(parts))
+
+
+def export_job(job):
+    # Runs in a worker process: (out, client name or None for the dashboard) -> (report, bytes, seconds)
+    out, name = job
+    start = time.perf_counter()
+    if name is None:
+        size = export_dashboard(out)
+    else:
+        size = export_client(out, name)
+    return name or "dashboard", size, time.perf_counter() - start
+
+
+def write_plotly_js(out):
+    path = os.path.join(out, PLOTLY_JS)
+    script = get_plotlyjs()
+    if not os.path.exists(path) or os.path.getsize(path) != len(script.encode("utf-8")):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(script)
+
+
+def write_index(out, names):
+    links = "".join(f'<li><a href="{html.escape(file_name(name))}">{html.escape(name)}</a></li>' for name in names)
+    body = f'<p><a href="dashboard.html">Client Dashboard</a></p>\n<h2>Client Journey Maps</h2>\n<ul>{links}</ul>\n'
+    write_page(os.path.join(out, "index.html"), "Client Reports", body)
+
+
+def export(out, names=None, workers=None, log=print):
+    os.makedirs(out, exist_ok=True)
+    catalog = get_catalog()
+    names = [catalog[name].name for name in names] if names else catalog.names
+    start = time.perf_counter()
+
+    # Fetch every source once, so the workers read the cache instead of the origin
+    urls = [data_url(n) for n in ("housed_date.csv", "bar_stack.csv", "storage.csv", "logs.csv")]
+    for client in catalog:
+        urls += [data_url(client.sleep)] if client.sleep else []
+    for name in names:
+        urls += [data_url(catalog[name].log), data_url(catalog[name].timeline)]
+    for result in failed(prefetch(urls)):
+        log(f"fetch  {result.url} failed: {result.error}")
+
+    write_plotly_js(out)
+    jobs = [(out, None)] + [(out, name) for name in names]
+    if workers != 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(export_job, jobs))
+    else:
+        results = [export_job(job) for job in jobs]
+    for report, size, seconds in results:
+        log(f"built  {report} ({size / 1024:.0f} KiB, {seconds:.3f}s)")
+    write_index(out, names)
+
+    elapsed = time.perf_counter() - start
+    log(f"{len(names)} clients + dashboard in {elapsed:.2f}s ({len(names) / elapsed:.2f} clients/s, "
+        f"{workers or os.cpu_count()} workers) -> {out}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the dashboard and every client's Journey Map to static HTML")
+    parser.add_argument("--out", default="reports", help="directory to write the reports to")
+    parser.add_argument("--clients", nargs="+", help="clients to export (default: every client in the catalog)")
+    parser.add_argument("--workers", type=int, default=None, help="export processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    export(args.out, args.clients, args.workers)
+
+
+if __name__ == "__main__":
+    main()
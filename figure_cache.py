@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+
+import tracing
+
+
+class FigureCache:
+    # Bounded LRU of built chart specs keyed by (chart, client, data version).
+    # Building a figure means loading, aggregating and running plotly express;
+    # once cached, a rerun that only changes presentation (width, height,
+    # theme) just re-applies a layout patch to the stored spec.
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        # build() returns a figure, or a tuple whose first item is a figure and
+        # the rest are companion results (e.g. the table next to a chart)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.note(cache="hit")
+                return value
+
+        tracing.note(cache="miss")
+        value = build()
+        if isinstance(value, tuple):
+            value = (value[0].to_dict(),) + value[1:]
+        else:
+            value = value.to_dict()
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def render(spec, **layout):
+    # Fresh figure from a cached spec with a presentation-only layout patch;
+    # the cached spec itself is never mutated
+    with tracing.span("render"):
+        figure = go.Figure({"data": spec.get("data", []), "layout": spec.get("layout", {}), "frames": spec.get("frames", [])})
+        if layout:
+            figure.update_layout(**layout)
+        return figure
+
+
+_cache = FigureCache(int(os.environ.get("TT_FIGURE_CACHE_SIZE", 128)))
+
+
+def get_cache():
+    return _cache
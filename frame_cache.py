@@ -0,0 +1,82 @@
+import os
+import threading
+from collections import OrderedDict
+
+import tracing
+
+
+class FrameCache:
+    # Process-wide store of parsed, typed source frames keyed by (file name,
+    # content version). Every Streamlit session runs in the same process, so a
+    # file loaded by one case worker is served to all the others from the same
+    # frame instead of each session holding its own copy. Frames are shared:
+    # callers derive new frames from them and never modify them in place.
+    #
+    # Entries are evicted least recently used first once their footprint
+    # (deep memory usage, measured when loaded) exceeds the byte budget.
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        # key is (name, version); a new version of a file replaces the old one
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.note(cache="hit")
+                return entry[0]
+
+        tracing.note(cache="miss")
+        frame = load()
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+
+        with self._lock:
+            self.misses += 1
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._size -= self._entries.pop(stale)[1]
+            if key not in self._entries:
+                self._entries[key] = (frame, size)
+                self._size += size
+            # The frame just loaded stays even when it alone is over budget
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self.evictions += 1
+        return frame
+
+    def footprint(self):
+        # [(file name, rows, bytes)], largest first
+        with self._lock:
+            entries = [(key[0], len(frame), size) for key, (frame, size) in self._entries.items()]
+        return sorted(entries, key=lambda entry: entry[2], reverse=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_cache = FrameCache(int(float(os.environ.get("TT_FRAME_CACHE_MB", 256)) * 1024 * 1024))
+
+
+def get_cache():
+    return _cache
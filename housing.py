@@ -0,0 +1,198 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# Vectorized housing-interval engine over housed_date.csv.
+#
+# Each client row holds one or more comma-joined "YYYY-MM-DD-YYYY-MM-DD"
+# ranges. All ranges are exploded and parsed in one batch and kept as sorted
+# day-resolution arrays, so aggregate queries are array operations (bincount,
+# cumulative max, searchsorted sweeps) rather than per-row Python loops.
+# Streamed periods are queued by add() and merged into the sorted arrays in
+# one batch before the next query: the batch is sorted on its own and placed
+# with a binary search on the packed (client, start) keys, without re-sorting
+# the existing periods. The engine is shared by every session thread; add()
+# and the queries hold its lock.
+
+DAY = np.timedelta64(1, "D")
+
+
+def sort_keys(codes, starts):
+    # (client code, start day) packed into one int64, ordered as lexsort((starts, codes))
+    return (codes.astype(np.int64) << 32) + (starts.astype(np.int64) + 2 ** 31)
+
+
+def parse_ranges(df, client_column="client", ranges_column="housed_date"):
+    rows = df[[client_column, ranges_column]].dropna(subset=[ranges_column])
+    rows = rows[rows[ranges_column].map(type) == str]
+    exploded = rows.assign(**{ranges_column: rows[ranges_column].str.split(",")}).explode(ranges_column)
+    ranges = exploded[ranges_column].str.strip()
+    start = pd.to_datetime(ranges.str[:10], format="%Y-%m-%d")
+    end = pd.to_datetime(ranges.str[11:21], format="%Y-%m-%d")
+    return pd.DataFrame({
+        "Client": exploded[client_column].astype(str).to_numpy(),
+        "Start": start.to_numpy(),
+        "End": end.to_numpy(),
+    })
+
+
+class HousingIntervals:
+
+    def __init__(self, clients, starts, ends):
+        # Clients are numbered in order of first appearance so tables keep the source file's order
+        codes, self.clients = pd.factorize(np.asarray(clients, dtype=object))
+        starts = np.asarray(starts, dtype="datetime64[D]")
+        ends = np.asarray(ends, dtype="datetime64[D]")
+
+        order = np.lexsort((starts, codes))
+        self.codes = codes[order]
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self._keys = sort_keys(self.codes, self.starts)
+        self._merged = None
+        self._sweep = None
+        self._pending = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_frame(cls, df, client_column="client", ranges_column="housed_date"):
+        parsed = parse_ranges(df, client_column, ranges_column)
+        return cls(parsed["Client"], parsed["Start"], parsed["End"])
+
+    def __len__(self):
+        with self._lock:
+            self._flush()
+            return len(self.codes)
+
+    # ---- streamed updates -----------------------------------------------
+
+    def add(self, client, start, end):
+        with self._lock:
+            self._pending.append((client, np.datetime64(start, "D"), np.datetime64(end, "D")))
+
+    def _flush(self):
+        # Merge queued periods into the sorted arrays; new clients are numbered after the existing ones.
+        # Callers hold the lock.
+        if not self._pending:
+            return
+        clients, starts, ends = zip(*self._pending)
+        self._pending = []
+        ids = {c: i for i, c in enumerate(self.clients)}
+        for client in clients:
+            ids.setdefault(client, len(ids))
+        self.clients = np.array(list(ids), dtype=object)
+        codes = np.array([ids[c] for c in clients], dtype=self.codes.dtype)
+        starts = np.array(starts, dtype="datetime64[D]")
+        ends = np.array(ends, dtype="datetime64[D]")
+        order = np.lexsort((starts, codes))
+        codes, starts, ends = codes[order], starts[order], ends[order]
+        keys = sort_keys(codes, starts)
+        # After any existing period with the same key, as a stable sort of old + new would place it
+        at = np.searchsorted(self._keys, keys, side="right")
+        self.codes = np.insert(self.codes, at, codes)
+        self.starts = np.insert(self.starts, at, starts)
+        self.ends = np.insert(self.ends, at, ends)
+        self._keys = np.insert(self._keys, at, keys)
+        self._merged = None
+        self._sweep = None
+
+    # ---- tables ---------------------------------------------------------
+
+    @property
+    def days(self):
+        # Inclusive of both the start and the end date
+        with self._lock:
+            self._flush()
+            return (self.ends - self.starts) // DAY + 1
+
+    def frame(self):
+        # One row per housing period, the shape px.timeline expects
+        with self._lock:
+            self._flush()
+            return pd.DataFrame({
+                "Client": self.clients[self.codes],
+                "Start": self.starts.astype("datetime64[ns]"),
+                "End": self.ends.astype("datetime64[ns]"),
+                "Days": self.days,
+            })
+
+    def total_days(self):
+        # Sum of period lengths per client (overlapping periods count twice,
+        # as in the original table); merged().groupby gives distinct days.
+        with self._lock:
+            self._flush()
+            totals = np.bincount(self.codes, weights=self.days, minlength=len(self.clients))
+            clients = self.clients
+        return pd.Series(totals.astype(np.int64), index=pd.Index(clients, name="Client"), name="Total Days Housed")
+
+    # ---- per-client structure -------------------------------------------
+
+    def _running_end(self):
+        # Latest end date seen so far within each client's sorted periods
+        ends = self.ends.astype(np.int64)
+        running = pd.Series(ends).groupby(self.codes).cummax().to_numpy()
+        previous = np.empty_like(running)
+        previous[0:1] = np.iinfo(np.int64).min
+        previous[1:] = running[:-1]
+        first = np.ones(len(self.codes), dtype=bool)
+        first[1:] = self.codes[1:] != self.codes[:-1]
+        previous[first] = np.iinfo(np.int64).min
+        return previous
+
+    def overlaps(self):
+        # Periods that start on or before the end of an earlier period of the same client
+        with self._lock:
+            if not len(self):
+                return self.frame().iloc[0:0]
+            mask = self.starts.astype(np.int64) <= self._running_end()
+            return self.frame()[mask].reset_index(drop=True)
+
+    def merged(self):
+        # Union of each client's periods; touching periods (end + 1 day == next start) are joined
+        with self._lock:
+            self._flush()
+            if self._merged is None:
+                if not len(self):
+                    self._merged = HousingIntervals([], [], [])
+                else:
+                    new_block = self.starts.astype(np.int64) > self._running_end() + 1
+                    first = np.flatnonzero(new_block)
+                    ends = np.maximum.reduceat(self.ends.astype(np.int64), first).astype("datetime64[D]")
+                    codes = self.codes[first]
+                    self._merged = HousingIntervals(self.clients[codes], self.starts[first], ends)
+            return self._merged
+
+    def gaps(self):
+        # Stretches between a client's consecutive (merged) housing periods
+        merged = self.merged()
+        same = merged.codes[1:] == merged.codes[:-1]
+        gap_start = merged.ends[:-1][same] + DAY
+        gap_end = merged.starts[1:][same] - DAY
+        return pd.DataFrame({
+            "Client": merged.clients[merged.codes[1:][same]],
+            "Start": gap_start.astype("datetime64[ns]"),
+            "End": gap_end.astype("datetime64[ns]"),
+            "Days": (gap_end - gap_start) // DAY + 1,
+        })
+
+    # ---- sweep-line occupancy -------------------------------------------
+
+    def occupancy(self, start=None, end=None):
+        # Number of clients housed on each day of [start, end]. Uses the merged
+        # periods sorted by start and by end: housed(d) = #starts <= d - #ends < d,
+        # two binary searches per day regardless of roster size.
+        with self._lock:
+            merged = self.merged()
+            if self._sweep is None:
+                self._sweep = (np.sort(merged.starts), np.sort(merged.ends))
+            sorted_starts, sorted_ends = self._sweep
+        if not len(sorted_starts):
+            return pd.Series(dtype=np.int64, name="Housed")
+
+        start = np.datetime64(start, "D") if start is not None else sorted_starts[0]
+        end = np.datetime64(end, "D") if end is not None else sorted_ends[-1]
+        days = np.arange(start, end + DAY, DAY)
+        counts = np.searchsorted(sorted_starts, days, side="right") - np.searchsorted(sorted_ends, days, side="left")
+        return pd.Series(counts, index=pd.DatetimeIndex(days.astype("datetime64[ns]"), name="Date"), name="Housed")
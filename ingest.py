@@ -0,0 +1,118 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import schema
+import snapshot
+import search_index
+from term_index import INDEX_FILE as TERMS_FILE, TermIndex
+
+
+# Compile the client corpus (CSV + timeline JSON) into the columnar snapshot
+# read by the app. Files whose content hash matches the existing manifest are
+# skipped, so a rebuild after a data drop only recompiles what changed.
+#
+#   python ingest.py [--source DIR] [--out DIR] [--force]
+
+IGNORED = {"requirements.txt"}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_files(source):
+    for name in sorted(os.listdir(source)):
+        if name in IGNORED or not name.endswith((".csv", ".json")):
+            continue
+        path = os.path.join(source, name)
+        if os.path.isfile(path):
+            yield name, path
+
+
+def build(source, out, force=False, log=print):
+    previous = snapshot.read_manifest(out) or {"tables": {}}
+    tables = {}
+    built = skipped = 0
+
+    for name, path in source_files(source):
+        digest = file_hash(path)
+        old = previous["tables"].get(name)
+        if not force and old and old["sha256"] == digest and os.path.isdir(os.path.join(out, old["path"])):
+            tables[name] = old
+            skipped += 1
+            continue
+
+        start = time.perf_counter()
+        kind, df, extra = schema.read_source(path, name)
+        if kind is None:
+            log(f"skip   {name}: unrecognised columns")
+            continue
+        rel = os.path.join("tables", name)
+        snapshot.write_table(os.path.join(out, rel), df, extra)
+        tables[name] = {"path": rel, "sha256": digest, "kind": kind, "rows": len(df)}
+        built += 1
+        log(f"built  {name} ({kind}, {len(df)} rows, {time.perf_counter() - start:.3f}s)")
+
+    # Drop tables whose source file has gone away
+    for name, entry in previous["tables"].items():
+        if name not in tables:
+            shutil.rmtree(os.path.join(out, entry["path"]), ignore_errors=True)
+            log(f"remove {name}")
+
+    build_term_index(out, tables, force, log)
+    search = build_search_index(out, tables, previous.get("search"), force, log)
+
+    manifest = {"version": snapshot.FORMAT_VERSION, "tables": tables, "search": search}
+    tmp = os.path.join(out, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, os.path.join(out, "manifest.json"))
+    log(f"{built} built, {skipped} unchanged -> {out}")
+    return manifest
+
+
+def build_term_index(out, tables, force=False, log=print):
+    # Word counts for every client log; only files whose hash moved are re-read
+    path = os.path.join(out, TERMS_FILE)
+    index = TermIndex.load(path) if os.path.exists(path) and not force else TermIndex()
+    added = 0
+    for name, entry in tables.items():
+        if entry["kind"] == schema.LOG:
+            table_path = os.path.join(out, entry["path"])
+            added += index.sync(name[:-len(".csv")], entry["sha256"], lambda: snapshot.Table(table_path).frame(["start_date", "log", "text"]))
+    index.save(path)
+    log(f"terms  {added} new log rows indexed")
+
+
+def build_search_index(out, tables, previous=None, force=False, log=print):
+    # One BM25 index over all client logs, rebuilt only when some log changed
+    logs = sorted((name, entry) for name, entry in tables.items() if entry["kind"] == schema.LOG)
+    digest = hashlib.sha256("".join(entry["sha256"] for _, entry in logs).encode()).hexdigest()
+    if not force and digest == previous and os.path.exists(os.path.join(out, search_index.SEARCH_DIR, "index.json")):
+        return digest
+    start = time.perf_counter()
+    docs = search_index.build(out, [(name[:-len(".csv")], name, os.path.join(out, entry["path"])) for name, entry in logs])
+    log(f"search {docs} log entries indexed ({time.perf_counter() - start:.3f}s)")
+    return digest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the client corpus into a columnar snapshot")
+    parser.add_argument("--source", default=os.path.dirname(os.path.abspath(__file__)), help="directory holding the CSV/JSON files")
+    parser.add_argument("--out", default=snapshot.SNAPSHOT_DIR, help="snapshot directory")
+    parser.add_argument("--force", action="store_true", help="rebuild every table regardless of content hash")
+    args = parser.parse_args(argv)
+    os.makedirs(args.out, exist_ok=True)
+    build(args.source, args.out, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
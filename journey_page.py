@@ -0,0 +1,121 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+from streamlit_timeline import timeline
+
+import snapshot
+import tracing
+from catalog import get_catalog
+from charts import cached_chart, load_timeline, generate_word_treemap, plot_sleep_calendar
+from data_cache import data_url
+from figure_cache import render
+from page_tools import prefetch_page
+from search_index import get_index as get_search_index
+
+
+# "Client Journey Map" page: one client's timeline, sleep check-in calendar,
+# word treemap, and search across every client's case logs.
+
+
+def show():
+    # List of clients
+    catalog = get_catalog()
+    clients = catalog.names
+    
+    st.write("# From Arrival to Progress: A Holistic View of The DI Services and Outcomes")
+    st.markdown('---')
+    
+    # Selectbox for clients
+    selected_client = st.selectbox('Search or Select client', clients)
+    
+
+    client = catalog[selected_client]
+    word_treemap_data_path = data_url(client.log)
+    timeline_data_url = data_url(client.timeline)
+    prefetch_page([timeline_data_url, word_treemap_data_path] + ([data_url(client.sleep)] if client.sleep else []))
+
+    events = load_timeline(timeline_data_url)
+
+    # Render client journey map timeline
+    st.write("## Client Journey Map Timeline")
+    display_timeline(events)
+
+    st.empty()
+
+
+    st.markdown('---')
+
+
+    st.write("## Sleep Check-ins")
+    if client.sleep:
+        height = st.slider('Select Calendar Height', 300, 1000, 450)
+        calendar_spec = cached_chart('sleep_calendar', selected_client, [data_url(client.sleep)], lambda: plot_sleep_calendar(selected_client))
+        fig = render(calendar_spec, autosize=True, width=800, height=height)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info(f"No sleep check-ins on file for {client.name}.")
+    st.markdown('---')
+
+    st.write("## Word Treemap")
+
+    fig = render(cached_chart('word_treemap', selected_client, [word_treemap_data_path], lambda: generate_word_treemap(word_treemap_data_path)))
+    st.plotly_chart(fig, use_container_width=True)
+    st.markdown('---')
+
+    display_log_search()
+
+
+def display_timeline(events):
+    # Only one date window / page of events goes to the browser; the full journey is listed
+    # as a compact date + headline index below it
+    start, end = events.first, events.last
+    if start is not None and start < end:
+        default_start = max(start, end - datetime.timedelta(days=365))
+        start, end = st.slider('Timeline window', min_value=start, max_value=end, value=(default_start, end), format='MMM D, YYYY')
+
+    pages = events.pages(start, end)
+    page = st.number_input(f'Page (of {pages})', min_value=1, max_value=pages, value=1) - 1 if pages > 1 else 0
+    payload = events.payload(start, end, page)
+    if not payload['events']:
+        st.info("No events in this window.")
+    else:
+        with tracing.span('render', chart='timeline', events=len(payload['events'])):
+            timeline(payload, height=800)
+
+    with st.expander(f"All {len(events)} events"):
+        dates, headlines = events.entries()
+        st.dataframe(pd.DataFrame({'Date': dates, 'Event': headlines}), hide_index=True, use_container_width=True)
+
+
+def display_log_search():
+    st.write("## Search Case Logs")
+
+    index = get_search_index()
+    if index is None:
+        st.info("Search needs the ingest snapshot. Run `python ingest.py` to build it.")
+        return
+
+    query = st.text_input('Search all client logs')
+    col1, col2 = st.columns([0.6, 0.4])
+    selected_clients = col1.multiselect('Clients', index.clients, placeholder='All clients')
+    date_range = col2.date_input('Date range', value=(), min_value=datetime.date(2000, 1, 1))
+    if not query:
+        return
+
+    start, end = (date_range[0], date_range[-1]) if date_range else (None, None)
+    with tracing.span('search', query=query) as span:
+        hits = index.search(query, k=25, clients=selected_clients or None, start=start, end=end)
+        span.set(hits=len(hits))
+    if not hits:
+        st.write("No matching log entries.")
+        return
+
+    # Hits point into the snapshot log tables; only the shown rows are decoded
+    for hit in hits:
+        table = snapshot.open_table(hit.table)
+        headline = table.string('headline', hit.row)
+        text = table.string('text', hit.row)
+        with st.expander(f"{hit.date} · {hit.client} · {headline}"):
+            st.write(text)
+            st.caption(f"{table.string('log', hit.row)} · score {hit.score:.2f}")
@@ -0,0 +1,27 @@
+from urllib.parse import unquote
+
+import streamlit as st
+
+import snapshot
+import tracing
+from charts import begin_rerun
+from prefetch import prefetch, failed
+
+
+# Helpers shared by the page modules (dashboard_page, journey_page,
+# cohort_page). Pages are imported by app.py the first time they are visited,
+# so each one imports only what it renders with.
+
+
+def prefetch_page(urls):
+    # Fetch every resource the page reads in one concurrent round before any chart is built;
+    # files already compiled into the snapshot are read from disk and need no fetch. Starts
+    # the rerun, so each source file's version is checked once from here on.
+    begin_rerun()
+    manifest = snapshot.read_manifest()
+    if manifest is not None:
+        urls = [url for url in urls if unquote(url.rsplit('/', 1)[-1]) not in manifest['tables']]
+    with tracing.span('prefetch', files=len(urls)):
+        results = prefetch(urls, deadline=15)
+    for result in failed(results):
+        st.warning(f"Could not load {result.url}: {result.error}")
@@ -0,0 +1,132 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+# Program-usage rollups. Visits are kept pre-summed per (client, program, time
+# bucket) at three granularities, all-time, monthly and weekly, so drill-down
+# queries (every program -> one program's clients -> its monthly trend) read a
+# few hundred summed cells instead of the visit rows. add() updates every
+# granularity in O(1); a granularity's query frame is rebuilt from its cells
+# only when something was added since its last query.
+#
+# bar_stack.csv visits carry no date and count in the all-time rollup only;
+# dated visits (e.g. from the append feed) count in all three.
+
+ALL = "all"
+MONTH = "month"
+WEEK = "week"
+GRANULARITIES = (ALL, MONTH, WEEK)
+
+COLUMNS = ["Patient.ID", "Reason", "Date", "Visits"]
+
+
+def bucket(date, granularity):
+    # First day of the month / week (Monday) holding date; None all-time or undated
+    if granularity == ALL or date is None or pd.isna(date):
+        return None
+    day = np.datetime64(pd.Timestamp(date).date(), "D")
+    if granularity == MONTH:
+        return day.astype("datetime64[M]").astype("datetime64[D]")
+    # 1970-01-01 was a Thursday
+    return day - (day.astype(np.int64) + 3) % 7
+
+
+class VisitRollups:
+
+    def __init__(self):
+        self._cells = {granularity: defaultdict(int) for granularity in GRANULARITIES}
+        self._programs = set()
+        self._frames = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_frame(cls, df):
+        # bar_stack.csv: Patient.ID, Reason, Visits; a Date column, if an export has one, is bucketed
+        rollups = cls()
+        rows = df.dropna(subset=["Reason", "Visits"])
+        keys = ["Patient.ID", "Reason"] + (["Date"] if "Date" in rows else [])
+        grouped = rows.groupby(keys, observed=True)["Visits"].sum()
+        for key, visits in grouped.items():
+            rollups.add(key[0], key[1], visits, key[2] if len(key) > 2 else None)
+        return rollups
+
+    def add(self, patient_id, program, visits, date=None):
+        with self._lock:
+            self._programs.add(program)
+            for granularity in GRANULARITIES:
+                if granularity == ALL or date is not None:
+                    self._cells[granularity][(patient_id, program, bucket(date, granularity))] += visits
+            self._frames.clear()
+
+    def frame(self, granularity=ALL):
+        # The summed cells of one granularity: Patient.ID, Reason, Date (NaT all-time), Visits
+        with self._lock:
+            frame = self._frames.get(granularity)
+            if frame is None:
+                cells = self._cells[granularity]
+                frame = pd.DataFrame([key + (visits,) for key, visits in cells.items()], columns=COLUMNS)
+                frame["Reason"] = pd.Categorical(frame["Reason"], categories=sorted(self._programs))
+                frame["Date"] = pd.to_datetime(frame["Date"])
+                self._frames[granularity] = frame
+            return frame
+
+    @property
+    def programs(self):
+        # Programs with any visits, in name order
+        return list(self.frame()["Reason"].cat.remove_unused_categories().cat.categories)
+
+    @property
+    def dated(self):
+        return bool(self._cells[MONTH])
+
+    def date_range(self):
+        # (first, last) day of the weeks holding dated visits, or None when no visit is dated
+        dates = self.frame(WEEK)["Date"]
+        return (dates.min().date(), (dates.max() + pd.Timedelta(days=6)).date()) if len(dates) else None
+
+    def query(self, by=("Reason",), clients=None, programs=None, start=None, end=None, granularity=None):
+        # Visits summed by any of "Patient.ID", "Reason" and "Date", sorted by
+        # them (programs by name). The all-time rollup answers unless the query
+        # groups by or filters on date; then the monthly one does (or
+        # granularity), keeping the buckets that overlap [start, end].
+        dated = start is not None or end is not None or "Date" in by
+        granularity = granularity or (MONTH if dated else ALL)
+        cells = self.frame(granularity)
+        mask = np.ones(len(cells), dtype=bool)
+        if clients is not None:
+            mask &= cells["Patient.ID"].isin(list(clients)).to_numpy()
+        if programs is not None:
+            mask &= cells["Reason"].isin(list(programs)).to_numpy()
+        if start is not None:
+            mask &= (cells["Date"] >= pd.Timestamp(bucket(start, granularity))).to_numpy()
+        if end is not None:
+            mask &= (cells["Date"] <= pd.Timestamp(end)).to_numpy()
+        selected = cells[mask]
+        if not by:
+            return selected["Visits"].sum()
+        # observed=True groups come back in order of appearance, not category order
+        return selected.groupby(list(by), observed=True)["Visits"].sum().sort_index()
+
+
+_rollups = None
+_rollups_key = None
+_lock = threading.Lock()
+
+
+def get_rollups(version, load):
+    # Process-wide rollups, rebuilt by load() only when the visits file's version changes
+    global _rollups, _rollups_key
+    with _lock:
+        if _rollups is None or _rollups_key != version:
+            _rollups = load()
+            _rollups_key = version
+        return _rollups
+
+
+def reset():
+    global _rollups, _rollups_key
+    with _lock:
+        _rollups = _rollups_key = None
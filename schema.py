@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Kinds of files in the corpus, recognised by their header rather than by name
+# so new clients need no code change.
+LOG = "log"            # <Client>.csv: start_date, log, text, headline
+SLEEP = "sleep"        # <client>.csv: Sleep, Program, ...
+TIMELINE = "timeline"  # <Client>.json: title + events
+HOUSED = "housed"      # housed_date.csv
+VISITS = "visits"      # bar_stack.csv
+STORAGE = "storage"    # storage.csv
+LOG_COUNTS = "log_counts"  # logs.csv
+
+# Low-cardinality string columns stored as categoricals
+CATEGORICAL = {"client", "Client", "Reason", "Program", "Service"}
+
+# Largest integer a float32 holds exactly
+_FLOAT32_EXACT = 2 ** 24
+
+
+def classify(name, columns):
+    if name.endswith(".json"):
+        return TIMELINE
+    columns = list(columns)
+    if columns[:4] == ["start_date", "log", "text", "headline"]:
+        return LOG
+    if columns[:2] == ["Sleep", "Program"]:
+        return SLEEP
+    if columns == ["client", "housed_date"]:
+        return HOUSED
+    if "Patient.ID" in columns and "Reason" in columns:
+        return VISITS
+    if columns[:1] == ["Client"] and "Total Logs" in columns:
+        return LOG_COUNTS
+    if columns[:1] == ["Client"]:
+        return STORAGE
+    return None
+
+
+def parse_sleep_dates(values):
+    # Sleep check-ins are exported day-first (25-05-2023), with the odd ISO
+    # date mixed in; parse both explicitly instead of letting pandas guess.
+    values = pd.Series(values)
+    dates = pd.to_datetime(values, format="%d-%m-%Y", errors="coerce")
+    missing = dates.isna() & values.notna()
+    if missing.any():
+        dates[missing] = pd.to_datetime(values[missing], errors="coerce")
+    return dates
+
+
+def read_source(path, name=None):
+    # Read one corpus file into a typed frame; returns (kind, frame, extra)
+    # where extra carries non-tabular parts such as a timeline's title card.
+    name = name or path
+    if name.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return TIMELINE, timeline_frame(data), {"title": data.get("title")}
+
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    kind = classify(name, df.columns)
+    return kind, coerce(df, kind), {}
+
+
+def event_dates(events):
+    # TimelineJS start_date objects -> datetime64; month and day default to 1
+    dates = [
+        "{}-{}-{}".format(e["start_date"].get("year"), e["start_date"].get("month", "01"), e["start_date"].get("day", "01"))
+        for e in events
+    ]
+    return pd.to_datetime(dates, errors="coerce")
+
+
+def timeline_frame(data):
+    events = data.get("events", [])
+    return pd.DataFrame({
+        "start_date": event_dates(events),
+        "headline": [e.get("text", {}).get("headline", "") for e in events],
+        "event": [json.dumps(e, ensure_ascii=False) for e in events],
+    })
+
+
+def coerce(df, kind):
+    # Apply the corpus dtypes: dates as datetime64, labels as categoricals,
+    # counts in the narrowest type that holds them
+    if kind == LOG:
+        df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
+    elif kind == SLEEP:
+        # Drop the empty "Unnamed: n" columns some exports carry
+        empty = [c for c in df.columns if c.startswith("Unnamed:") and df[c].isna().all()]
+        df = df.drop(columns=empty)
+        df["Sleep"] = parse_sleep_dates(df["Sleep"])
+    for column in df.columns:
+        if column in CATEGORICAL and df[column].dtype == object:
+            df[column] = df[column].astype("category")
+    return compact_numbers(df)
+
+
+def compact_numbers(df):
+    # int64 counts (storage, log totals) downcast to int8/16/32; whole-number
+    # float columns (Visits, Patient.ID, which are float only because of blank
+    # rows) to float32 when every value fits exactly
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series.dtype) and series.dtype != np.float32:
+            values = series.dropna().to_numpy()
+            if not len(values) or ((values == np.round(values)).all() and np.abs(values).max() < _FLOAT32_EXACT):
+                df[column] = series.astype(np.float32)
+    return df
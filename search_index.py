@@ -0,0 +1,201 @@
+import json
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+
+import numpy as np
+
+import snapshot
+
+
+# BM25 full-text index over every client log entry, built by ingest.py into
+# <snapshot>/search/. Postings are stored CSR-style (term -> slice of doc ids
+# and term frequencies) as .npy files opened memory-mapped, so loading the
+# index costs one small JSON vocabulary and queries only page in the postings
+# of the terms they ask for. Entry text is not duplicated: hits point back at
+# the row of the client's log table in the snapshot.
+#
+# A rebuild is written to a new directory and swapped in whole, so an index
+# a running app has open keeps reading the files it mapped.
+
+SEARCH_DIR = "search"
+K1 = 1.2
+B = 0.75
+
+_WORD = re.compile(r"\w+")
+EPOCH = np.datetime64("1970-01-01", "D")
+# doc_day of entries without a date; indexes built before it was recorded used -1
+UNDATED = np.iinfo(np.int32).min
+
+
+def tokenize(text):
+    # Keep every word, numbers and log IDs included; BM25's idf already
+    # discounts the common ones
+    return _WORD.findall(text.lower()) if isinstance(text, str) else []
+
+
+def build(out, tables):
+    # tables: [(client, table name, table directory)] for every client log
+    doc_client, doc_day, doc_row, doc_len = [], [], [], []
+    post_term, post_doc, post_tf = [], [], []
+    vocab = {}
+    clients = []
+
+    for cid, (client, name, table_path) in enumerate(tables):
+        clients.append([client, name])
+        frame = snapshot.Table(table_path).frame(["start_date", "text", "headline"])
+        dates = frame["start_date"].to_numpy().astype("datetime64[D]")
+        days = np.where(np.isnat(dates), UNDATED, (dates - EPOCH).astype(np.int64))
+        for row, (text, headline) in enumerate(zip(frame["text"], frame["headline"])):
+            tokens = tokenize(headline) + tokenize(text)
+            doc = len(doc_client)
+            doc_client.append(cid)
+            doc_day.append(days[row])
+            doc_row.append(row)
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                tid = vocab.setdefault(term, len(vocab))
+                post_term.append(tid)
+                post_doc.append(doc)
+                post_tf.append(tf)
+
+    post_term = np.asarray(post_term, dtype=np.int32)
+    order = np.argsort(post_term, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(post_term, minlength=len(vocab)), out=offsets[1:])
+
+    path = os.path.join(out, SEARCH_DIR)
+    tmp, old = path + ".tmp", path + ".old"
+    for stale in (tmp, old):
+        shutil.rmtree(stale, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {
+        "doc_client": np.asarray(doc_client, dtype=np.int32),
+        "doc_day": np.asarray(doc_day, dtype=np.int32),
+        "doc_row": np.asarray(doc_row, dtype=np.int32),
+        "doc_len": np.asarray(doc_len, dtype=np.int32),
+        "offsets": offsets,
+        "post_doc": np.asarray(post_doc, dtype=np.int32)[order],
+        "post_tf": np.asarray(post_tf, dtype=np.int32)[order],
+    }
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp, key + ".npy"), array)
+    with open(os.path.join(tmp, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"clients": clients, "vocab": vocab, "undated": int(UNDATED)}, f, ensure_ascii=False)
+
+    # A directory can't be replaced while it has files: move the old one aside first
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return len(doc_client)
+
+
+class Hit:
+    __slots__ = ("client", "table", "row", "date", "score")
+
+    def __init__(self, client, table, row, date, score):
+        self.client = client
+        self.table = table
+        self.row = row
+        self.date = date
+        self.score = score
+
+
+class SearchIndex:
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.clients = [c for c, _ in meta["clients"]]
+        self._tables = [t for _, t in meta["clients"]]
+        self._vocab = meta["vocab"]
+        self._undated = meta.get("undated", -1)
+        load = lambda key: np.load(os.path.join(path, key + ".npy"), mmap_mode="r")
+        self.doc_client = load("doc_client")
+        self.doc_day = load("doc_day")
+        self.doc_row = load("doc_row")
+        self.doc_len = load("doc_len")
+        self.offsets = load("offsets")
+        self.post_doc = load("post_doc")
+        self.post_tf = load("post_tf")
+        self.avg_len = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+
+    def __len__(self):
+        return len(self.doc_client)
+
+    def search(self, query, k=20, clients=None, start=None, end=None):
+        n = len(self)
+        terms = {self._vocab[t] for t in tokenize(query) if t in self._vocab}
+        if not n or not terms:
+            return []
+
+        # Score only the documents in the query terms' postings
+        docs, scores = [], []
+        for tid in terms:
+            lo, hi = self.offsets[tid], self.offsets[tid + 1]
+            d = np.asarray(self.post_doc[lo:hi])
+            tf = np.asarray(self.post_tf[lo:hi], dtype=np.float64)
+            idf = np.log(1 + (n - len(d) + 0.5) / (len(d) + 0.5))
+            norm = K1 * (1 - B + B * self.doc_len[d] / self.avg_len)
+            docs.append(d)
+            scores.append(idf * tf * (K1 + 1) / (tf + norm))
+        docs = np.concatenate(docs)
+        scores = np.concatenate(scores)
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if clients is not None:
+            clients = set(clients)
+            wanted = [i for i, c in enumerate(self.clients) if c in clients]
+            keep &= np.isin(self.doc_client[candidates], wanted)
+        if start is not None or end is not None:
+            days = self.doc_day[candidates]
+            keep &= days != self._undated
+            if start is not None:
+                keep &= days >= _day(start)
+            if end is not None:
+                keep &= days <= _day(end)
+        candidates, totals = candidates[keep], totals[keep]
+
+        k = min(k, len(candidates))
+        if k <= 0:
+            return []
+        best = np.argpartition(-totals, k - 1)[:k]
+        best = best[np.argsort(-totals[best], kind="stable")]
+        hits = []
+        for i in best:
+            doc = candidates[i]
+            cid = int(self.doc_client[doc])
+            day = int(self.doc_day[doc])
+            date = (EPOCH + np.timedelta64(day, "D")) if day != self._undated else None
+            hits.append(Hit(self.clients[cid], self._tables[cid], int(self.doc_row[doc]), date, float(totals[i])))
+        return hits
+
+
+def _day(value):
+    return int((np.datetime64(value, "D") - EPOCH).astype(np.int64))
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(root=snapshot.SNAPSHOT_DIR):
+    # Loaded on first search and shared by every session; None without a snapshot.
+    # Keyed by the manifest so a re-ingest is picked up on the next query.
+    manifest = snapshot.read_manifest(root)
+    path = os.path.join(root, SEARCH_DIR)
+    if manifest is None or not os.path.exists(os.path.join(path, "index.json")):
+        return None
+    key = (root, manifest.get("search"))
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            _indexes.clear()
+            index = _indexes[key] = SearchIndex(path)
+        return index
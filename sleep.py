@@ -0,0 +1,248 @@
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+# Vectorized sleep-pattern engine over the per-client sleep check-in CSVs
+# (Sleep, Program). All clients are folded into one (client x date) cube of
+# day-sleep and night-sleep counts in a single pass. The cube is stored
+# sparsely, CSR-style: cells sorted by (client, date) with per-client offsets,
+# so a client's calendar is an O(1) slice and agency-wide views are bincounts
+# over the date axis. Streamed check-ins are folded in with add(), into an
+# overlay of (client, date) cells merged with the CSR arrays at query time.
+# The cube is shared by every session thread; add() and the overlay reads
+# hold its lock.
+
+DAY_VALUE = 1
+NIGHT_VALUE = 30
+EPOCH = np.datetime64("1970-01-01", "D")
+
+_FLOOR = re.compile(r"(\d)(?:st|nd|rd|th) Floor", re.IGNORECASE)
+
+
+def calendar_value(day, night):
+    # Calendar colour scale: 1 = day sleep, 30 = night, 15 = both on the same
+    # date; anything above a single night is capped at a night.
+    value = np.asarray(day) * DAY_VALUE + np.asarray(night) * NIGHT_VALUE
+    return np.where(value == DAY_VALUE + NIGHT_VALUE, 15, np.where(value > 35, NIGHT_VALUE, value))
+
+
+def floor_of(programs):
+    # "3rd Floor Male Night" -> "3rd Floor"; off-site programs keep their name
+    programs = pd.Series(programs, dtype=object).fillna("Unknown").astype(str)
+    floors = programs.str.extract(_FLOOR, expand=False)
+    return np.where(floors.notna(), floors.map(lambda n: f"{n}{_suffix(n)} Floor"), programs)
+
+
+def _suffix(n):
+    return {"1": "st", "2": "nd", "3": "rd"}.get(str(n), "th")
+
+
+class SleepCube:
+
+    def __init__(self, clients, offsets, days, day_counts, night_counts, floors):
+        self.clients = list(clients)
+        self._client_ids = {c: i for i, c in enumerate(self.clients)}
+        self.offsets = offsets
+        self.days = days
+        self.day_counts = day_counts
+        self.night_counts = night_counts
+        self.floors = floors
+        # Streamed cells: {client id: {day: [base position or -1, day, night]}}
+        self._added = {}
+        self._added_floors = Counter()
+        self._combined = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, frames):
+        # frames: {client: DataFrame with a datetime 'Sleep' and a 'Program' column}
+        clients = list(frames)
+        parts = [frames[c][["Sleep", "Program"]] for c in clients]
+        lengths = np.array([len(p) for p in parts], dtype=np.int64)
+        rows = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame({"Sleep": [], "Program": []})
+
+        codes = np.repeat(np.arange(len(clients), dtype=np.int64), lengths)
+        dates = pd.to_datetime(rows["Sleep"]).to_numpy().astype("datetime64[D]")
+        valid = ~np.isnat(dates)
+        codes, dates, programs = codes[valid], dates[valid], rows["Program"][valid]
+        days = (dates - EPOCH).astype(np.int64)
+        is_day = programs.astype(object).str.lower().str.contains("day", regex=False).fillna(False).to_numpy(dtype=bool)
+
+        # One cell per (client, date): fold the rows with a single unique + bincount
+        if len(days):
+            day0 = days.min()
+            span = days.max() - day0 + 1
+            keys, inverse = np.unique(codes * span + (days - day0), return_inverse=True)
+            cell_client = keys // span
+            cell_days = (keys % span + day0).astype(np.int32)
+            day_counts = np.bincount(inverse, weights=is_day, minlength=len(keys)).astype(np.int16)
+            night_counts = np.bincount(inverse, weights=~is_day, minlength=len(keys)).astype(np.int16)
+        else:
+            cell_client = np.empty(0, np.int64)
+            cell_days = np.empty(0, np.int32)
+            day_counts = night_counts = np.empty(0, np.int16)
+        offsets = np.searchsorted(cell_client, np.arange(len(clients) + 1))
+
+        # Check-ins per (date, floor) for the utilisation view
+        floors = pd.DataFrame({"Date": dates.astype("datetime64[ns]"), "Floor": floor_of(programs.to_numpy())})
+        floors = floors.groupby(["Date", "Floor"]).size().unstack(fill_value=0)
+        return cls(clients, offsets, cell_days, day_counts, night_counts, floors)
+
+    def __contains__(self, client):
+        return client in self._client_ids
+
+    # ---- streamed updates -------------------------------------------------
+
+    def add(self, client, date, program):
+        # One check-in: O(log k) to find the client's existing cell, O(1) otherwise
+        day = int((np.datetime64(date, "D") - EPOCH).astype(np.int64))
+        is_day = "day" in str(program).lower()
+        floor = floor_of([program])[0]
+        with self._lock:
+            i = self._client_ids.get(client)
+            if i is None:
+                i = self._client_ids[client] = len(self.clients)
+                self.clients.append(client)
+            cells = self._added.setdefault(i, {})
+            cell = cells.get(day)
+            if cell is None:
+                lo, hi = self._bounds(i)
+                pos = lo + int(np.searchsorted(self.days[lo:hi], day))
+                cell = cells[day] = [pos if pos < hi and self.days[pos] == day else -1, 0, 0]
+            cell[1 if is_day else 2] += 1
+            self._added_floors[(np.datetime64(date, "D"), floor)] += 1
+            self._combined = None
+
+    def _bounds(self, i):
+        # Base CSR slice of a client; clients first seen in the stream have none
+        if i + 1 < len(self.offsets):
+            return int(self.offsets[i]), int(self.offsets[i + 1])
+        return len(self.days), len(self.days)
+
+    # ---- single-client slices ---------------------------------------------
+
+    def _client_cells(self, client):
+        with self._lock:
+            i = self._client_ids[client]
+            lo, hi = self._bounds(i)
+            added = {day: tuple(cell) for day, cell in self._added.get(i, {}).items()}
+        days, day_counts, night_counts = self.days[lo:hi], self.day_counts[lo:hi], self.night_counts[lo:hi]
+        if added:
+            days, day_counts, night_counts = days.copy(), day_counts.copy(), night_counts.copy()
+            new = [(day, d, n) for day, (pos, d, n) in added.items() if pos < 0]
+            for pos, d, n in added.values():
+                if pos >= 0:
+                    day_counts[pos - lo] += d
+                    night_counts[pos - lo] += n
+            if new:
+                extra = np.array(new, dtype=np.int64).T
+                days = np.concatenate([days, extra[0].astype(days.dtype)])
+                day_counts = np.concatenate([day_counts, extra[1].astype(day_counts.dtype)])
+                night_counts = np.concatenate([night_counts, extra[2].astype(night_counts.dtype)])
+                order = np.argsort(days, kind="stable")
+                days, day_counts, night_counts = days[order], day_counts[order], night_counts[order]
+        return days, day_counts, night_counts
+
+    def cells(self, client):
+        days, day_counts, night_counts = self._client_cells(client)
+        return pd.DataFrame({
+            "Sleep": (EPOCH + days.astype("timedelta64[D]")).astype("datetime64[ns]"),
+            "day": day_counts,
+            "night": night_counts,
+        })
+
+    def calendar(self, client):
+        # Frame for calplot: one value per check-in date plus a day sentinel
+        # before the first and a night sentinel after the last date, which
+        # pin the colour scale to the full day..night range.
+        days, day_counts, night_counts = self._client_cells(client)
+        days = days.astype(np.int64)
+        values = calendar_value(day_counts, night_counts)
+        if len(days):
+            days = np.concatenate([[days[0] - 1], days, [days[-1] + 1]])
+            values = np.concatenate([[DAY_VALUE], values, [NIGHT_VALUE]])
+        dates = (EPOCH + days.astype("timedelta64[D]")).astype("datetime64[ns]")
+        return pd.DataFrame({"Sleep": dates, "value": values})
+
+    # ---- agency-wide views ------------------------------------------------
+
+    def _cells(self):
+        # Every (client, date) cell with the streamed overlay applied: (days, day counts, night counts)
+        with self._lock:
+            if not self._added:
+                return self.days, self.day_counts, self.night_counts
+            if self._combined is None:
+                day_counts, night_counts = self.day_counts.copy(), self.night_counts.copy()
+                new = []
+                for cells in self._added.values():
+                    for day, (pos, d, n) in cells.items():
+                        if pos >= 0:
+                            day_counts[pos] += d
+                            night_counts[pos] += n
+                        else:
+                            new.append((day, d, n))
+                days = self.days
+                if new:
+                    extra = np.array(new, dtype=np.int64).T
+                    days = np.concatenate([days, extra[0].astype(days.dtype)])
+                    day_counts = np.concatenate([day_counts, extra[1].astype(day_counts.dtype)])
+                    night_counts = np.concatenate([night_counts, extra[2].astype(night_counts.dtype)])
+                self._combined = (days, day_counts, night_counts)
+            return self._combined
+
+    def _by_date(self, days, weights, start=None, end=None):
+        if not len(days):
+            return pd.Series(dtype=np.int64)
+        day0 = int(days.min())
+        counts = np.bincount(days - day0, weights=weights).astype(np.int64)
+        index = pd.DatetimeIndex((EPOCH + (np.arange(len(counts)) + day0).astype("timedelta64[D]")).astype("datetime64[ns]"), name="Date")
+        return pd.Series(counts, index=index).loc[start:end]
+
+    def nightly_beds(self, start=None, end=None):
+        # Clients with a night check-in on each date
+        days, _, night_counts = self._cells()
+        return self._by_date(days, night_counts > 0, start, end).rename("Night Beds")
+
+    def day_sleepers(self, start=None, end=None):
+        days, day_counts, _ = self._cells()
+        return self._by_date(days, day_counts > 0, start, end).rename("Day Sleep")
+
+    def floor_utilisation(self, start=None, end=None):
+        # Check-ins per floor / program on each date
+        floors = self.floors
+        with self._lock:
+            added_floors = list(self._added_floors.items())
+        if added_floors:
+            added = pd.DataFrame([(d, f, n) for (d, f), n in added_floors], columns=["Date", "Floor", "n"])
+            added["Date"] = added["Date"].astype("datetime64[ns]")
+            added = added.pivot_table(index="Date", columns="Floor", values="n", aggfunc="sum", fill_value=0)
+            floors = floors.add(added, fill_value=0).fillna(0).astype(np.int64)
+        return floors.loc[start:end]
+
+
+_cube = None
+_cube_key = None
+_lock = threading.Lock()
+
+
+def get_cube(versions, load):
+    # Process-wide cube, rebuilt only when a client's sleep file version changes.
+    # versions: {client: content version}; load(client) -> that client's frame.
+    global _cube, _cube_key
+    key = tuple(sorted(versions.items()))
+    with _lock:
+        if _cube is None or _cube_key != key:
+            _cube = SleepCube.build({client: load(client) for client in versions})
+            _cube_key = key
+        return _cube
+
+
+def reset():
+    # Drop the cached cube so the next get_cube() rebuilds it
+    global _cube, _cube_key
+    with _lock:
+        _cube = _cube_key = None
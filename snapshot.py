@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+# Columnar snapshot of the client corpus, written by ingest.py.
+#
+#   <root>/manifest.json            source file -> sha256, kind, table dir
+#   <root>/tables/<file>/_table.json  column layout
+#   <root>/tables/<file>/<n>.npy      numeric / datetime64 / category codes
+#   <root>/tables/<file>/<n>.bin      utf-8 string data, <n>.off.npy offsets
+#
+# Every array is opened memory-mapped, so reading a numeric or date column is a
+# zero-copy view of the page cache and only string columns are decoded.
+
+SNAPSHOT_DIR = os.environ.get("TT_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot"))
+FORMAT_VERSION = 1
+
+
+def write_table(path, df, extra=None):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        base = os.path.join(path, str(i))
+        spec = {"name": name}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            spec["kind"] = "category"
+            spec["categories"] = [str(c) for c in series.cat.categories]
+            np.save(base + ".npy", series.cat.codes.to_numpy())
+        elif series.dtype == object:
+            spec["kind"] = "string"
+            _write_strings(base, series)
+        else:
+            spec["kind"] = "array"
+            np.save(base + ".npy", series.to_numpy())
+        columns.append(spec)
+
+    meta = {"rows": len(df), "columns": columns, "extra": extra or {}}
+    with open(os.path.join(path, "_table.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def _write_strings(base, series):
+    offsets = np.zeros(len(series) + 1, dtype=np.int64)
+    nulls = series.isna().to_numpy()
+    with open(base + ".bin", "wb") as f:
+        for i, value in enumerate(series.to_numpy()):
+            data = b"" if nulls[i] else str(value).encode("utf-8")
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+    np.save(base + ".off.npy", offsets)
+    if nulls.any():
+        np.save(base + ".null.npy", nulls)
+
+
+class Table:
+    # Lazily opened snapshot table; nothing is read until a column is asked for
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "_table.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.extra = meta["extra"]
+        self.columns = [c["name"] for c in meta["columns"]]
+        self._specs = {c["name"]: (i, c) for i, c in enumerate(meta["columns"])}
+
+    def array(self, name):
+        # Raw memory-mapped array for a numeric, datetime or category column
+        i, spec = self._specs[name]
+        if spec["kind"] == "string":
+            raise TypeError(f"{name} is a string column; use column() or string()")
+        return np.load(os.path.join(self.path, f"{i}.npy"), mmap_mode="r")
+
+    def string(self, name, row):
+        # Decode a single value of a string column without touching the rest
+        i, _ = self._specs[name]
+        base = os.path.join(self.path, str(i))
+        offsets = np.load(base + ".off.npy", mmap_mode="r")
+        with open(base + ".bin", "rb") as f:
+            f.seek(int(offsets[row]))
+            return f.read(int(offsets[row + 1] - offsets[row])).decode("utf-8")
+
+    def strings(self, name, rows):
+        # Decode the given rows of a string column, reading only their byte ranges
+        i, _ = self._specs[name]
+        base = os.path.join(self.path, str(i))
+        offsets = np.load(base + ".off.npy", mmap_mode="r")
+        values = []
+        with open(base + ".bin", "rb") as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                values.append(f.read(int(offsets[row + 1] - offsets[row])).decode("utf-8"))
+        return values
+
+    def column(self, name):
+        i, spec = self._specs[name]
+        base = os.path.join(self.path, str(i))
+        if spec["kind"] == "array":
+            return pd.Series(np.load(base + ".npy", mmap_mode="r"), name=name, copy=False)
+        if spec["kind"] == "category":
+            codes = np.load(base + ".npy", mmap_mode="r")
+            return pd.Series(pd.Categorical.from_codes(codes, spec["categories"]), name=name)
+
+        offsets = np.load(base + ".off.npy", mmap_mode="r")
+        with open(base + ".bin", "rb") as f:
+            blob = f.read()
+        values = [blob[offsets[k]:offsets[k + 1]].decode("utf-8") for k in range(self.rows)]
+        series = pd.Series(values, name=name, dtype=object)
+        if os.path.exists(base + ".null.npy"):
+            series[np.load(base + ".null.npy")] = np.nan
+        return series
+
+    def frame(self, columns=None):
+        # Numeric and date columns stay views of their memory maps; pd.concat would copy them
+        columns = columns or self.columns
+        if not columns:
+            return pd.DataFrame(index=range(self.rows))
+        return pd.DataFrame({c: self.column(c) for c in columns}, columns=columns, copy=False)
+
+
+_manifests = {}
+
+
+def read_manifest(root=SNAPSHOT_DIR):
+    # Parsed once per manifest write; reruns only pay for a stat()
+    path = os.path.join(root, "manifest.json")
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _manifests.get(root)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != FORMAT_VERSION:
+        manifest = None
+    _manifests[root] = (mtime, manifest)
+    return manifest
+
+
+_tables = {}
+
+
+def open_table(name, root=SNAPSHOT_DIR):
+    # Table for a source file name (e.g. "bar_stack.csv"), or None when there
+    # is no snapshot or the file is not in it so callers can fall back to CSV.
+    manifest = read_manifest(root)
+    if manifest is None or name not in manifest["tables"]:
+        return None
+    entry = manifest["tables"][name]
+    key = (root, name, entry["sha256"])
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = Table(os.path.join(root, entry["path"]))
+    return table
+
+
+def load_table(name, columns=None, root=SNAPSHOT_DIR):
+    table = open_table(name, root)
+    return None if table is None else table.frame(columns)
@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+import os
+import threading
+import weakref
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from catalog import client_key
+
+
+# Append-only streaming ingestion. New records arrive as JSON lines appended to
+# a feed file (TT_FEED) and/or as files dropped into a directory (TT_FEED_DIR:
+# *.jsonl, or <type>-*.csv with the record fields as columns). Each poll reads
+# only what was added since the last one.
+#
+# Records are kept in a journal per type and folded into small running totals
+# as they arrive (O(1) each). The dashboard engines (sleep cube, visit rollups,
+# housing intervals, term index) are brought up to date by replay(), which applies
+# only the records an engine has not seen yet, in place.
+#
+# A refreshed export (a new version of a source file) is taken to hold every
+# record streamed before the refresh was first seen. watermark() records the
+# journal position at that point, so an engine rebuilt from the new export
+# replays only the records after it, and the running totals of the kind
+# restart there. The first version of a source seen keeps the whole journal.
+#
+#   {"type": "log", "client", "start_date", "log", "text", "headline"}
+#   {"type": "sleep", "client", "date", "program"}
+#   {"type": "visit", "patient_id", "reason", "visits": 1, "date": null}
+#   {"type": "storage", "client", "service", "count": 1}
+#   {"type": "log_count", "client", "logs": 0, "bars": 0}
+#   {"type": "housing", "client", "start", "end"}
+
+LOG = "log"
+SLEEP = "sleep"
+VISIT = "visit"
+STORAGE = "storage"
+LOG_COUNT = "log_count"
+HOUSING = "housing"
+
+FIELDS = {
+    LOG: ("client", "start_date", "log", "text", "headline"),
+    SLEEP: ("client", "date", "program"),
+    VISIT: ("patient_id", "reason", "visits", "date"),
+    STORAGE: ("client", "service", "count"),
+    LOG_COUNT: ("client", "logs", "bars"),
+    HOUSING: ("client", "start", "end"),
+}
+DEFAULTS = {VISIT: {"visits": 1, "date": None}, STORAGE: {"count": 1}, LOG_COUNT: {"logs": 0, "bars": 0}}
+DATES = {LOG: ("start_date",), SLEEP: ("date",), VISIT: ("date",), HOUSING: ("start", "end")}
+NUMBERS = {VISIT: ("patient_id", "visits"), STORAGE: ("count",), LOG_COUNT: ("logs", "bars")}
+
+
+class RecordError(ValueError):
+    pass
+
+
+def parse_date(value):
+    # ISO dates as in the log files, or the day-first dates of the sleep export
+    for format in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(str(value).strip()[:10], format).date()
+        except ValueError:
+            continue
+    raise RecordError(f"unrecognised date {value!r}")
+
+
+def normalize(record):
+    kind = record.get("type")
+    if kind not in FIELDS:
+        raise RecordError(f"unknown record type {kind!r}")
+    fields = {**DEFAULTS.get(kind, {}), **{k: v for k, v in record.items() if v not in ("", None)}}
+    missing = [f for f in FIELDS[kind] if f not in fields]
+    if missing:
+        raise RecordError(f"{kind} record missing {', '.join(missing)}")
+    out = {f: fields[f] for f in FIELDS[kind]}
+    for f in DATES.get(kind, ()):
+        # A date defaulting to None is optional
+        if out[f] is not None:
+            out[f] = parse_date(out[f])
+    for f in NUMBERS.get(kind, ()):
+        try:
+            out[f] = int(float(out[f]))
+        except (TypeError, ValueError):
+            raise RecordError(f"{kind} record field {f} is not a number: {out[f]!r}")
+    if "client" in out:
+        out["client"] = str(out["client"]).strip()
+    return kind, out
+
+
+def _empty_totals(kind):
+    return Counter() if kind == VISIT else defaultdict(Counter)
+
+
+def _count(totals, kind, record):
+    # Fold one record into the running totals of its kind
+    if kind == VISIT:
+        totals[(record["patient_id"], record["reason"])] += record["visits"]
+    elif kind == STORAGE:
+        totals[client_key(record["client"])][record["service"]] += record["count"]
+    elif kind == LOG_COUNT:
+        counts = totals[client_key(record["client"])]
+        counts["Total Logs"] += record["logs"]
+        counts["Total Bars"] += record["bars"]
+
+
+class Feed:
+
+    def __init__(self, path=None, directory=None):
+        self.path = path
+        self.directory = directory
+        self.rejected = 0
+        self._journal = {kind: [] for kind in FIELDS}
+        self._versions = Counter()
+        # Running totals per kind, counted from journal position _totals_from[kind]
+        self._totals = {kind: _empty_totals(kind) for kind in (VISIT, STORAGE, LOG_COUNT)}
+        self._totals_from = Counter()
+        self._watermarks = {}
+        self._offset = 0
+        self._partial = b""
+        self._seen_files = set()
+        self._replayed = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+
+    # ---- ingestion ------------------------------------------------------
+
+    def append(self, record):
+        kind, record = normalize(record)
+        with self._lock:
+            self._journal[kind].append(record)
+            self._versions[kind] += 1
+            if kind in self._totals:
+                _count(self._totals[kind], kind, record)
+        return kind
+
+    def extend(self, records):
+        added = 0
+        for record in records:
+            try:
+                self.append(record)
+                added += 1
+            except RecordError:
+                self.rejected += 1
+        return added
+
+    def poll(self):
+        # Pick up whatever was appended to the feed file or dropped in the
+        # directory since the last poll; returns the number of new records
+        with self._lock:
+            added = 0
+            if self.path:
+                added += self._poll_file()
+            if self.directory:
+                added += self._poll_directory()
+            return added
+
+    def _poll_file(self):
+        try:
+            size = os.stat(self.path).st_size
+        except OSError:
+            return 0
+        if size < self._offset:
+            # Truncated or replaced: the feed starts over
+            self._offset, self._partial = 0, b""
+        if size == self._offset:
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = self._partial + f.read(size - self._offset)
+        self._offset = size
+        # A line still being written stays buffered until its newline arrives
+        data, _, self._partial = data.rpartition(b"\n")
+        return self.extend(_json_lines(data.decode("utf-8")))
+
+    def _poll_directory(self):
+        added = 0
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name in self._seen_files or not os.path.isfile(path):
+                continue
+            if name.endswith(".jsonl"):
+                with open(path, encoding="utf-8") as f:
+                    added += self.extend(_json_lines(f.read()))
+            elif name.endswith(".csv"):
+                kind = name.split("-", 1)[0].rsplit(".", 1)[0]
+                with open(path, encoding="utf-8-sig", newline="") as f:
+                    added += self.extend({"type": kind, **row} for row in csv.DictReader(f))
+            else:
+                continue
+            self._seen_files.add(name)
+        return added
+
+    # ---- queries --------------------------------------------------------
+
+    def version(self, kind):
+        return self._versions[kind]
+
+    def records(self, kind):
+        with self._lock:
+            return list(self._journal[kind])
+
+    def watermark(self, kind, source, version):
+        # Journal position of kind when this version of source was first seen;
+        # 0 for the first version seen
+        with self._lock:
+            mark = self._watermarks.get((kind, source))
+            if mark is None:
+                mark = self._watermarks[(kind, source)] = (version, 0)
+            elif mark[0] != version:
+                mark = self._watermarks[(kind, source)] = (version, len(self._journal[kind]))
+                if kind in self._totals:
+                    self._totals[kind] = _empty_totals(kind)
+                    self._totals_from[kind] = mark[1]
+            return mark[1]
+
+    def _totals_since(self, kind, since):
+        # Totals of the records of kind from journal position since; recounted
+        # unless since is where the running totals start
+        if since == self._totals_from[kind]:
+            return self._totals[kind]
+        totals = _empty_totals(kind)
+        for record in self._journal[kind][since:]:
+            _count(totals, kind, record)
+        return totals
+
+    def visits(self, since=0):
+        # {(patient_id, reason): visits} streamed so far
+        with self._lock:
+            return dict(self._totals_since(VISIT, since))
+
+    def storage(self, client, since=0):
+        with self._lock:
+            return dict(self._totals_since(STORAGE, since).get(client_key(client), {}))
+
+    def storage_totals(self, since=0):
+        # {client key: {service: count}} streamed so far, for every client
+        with self._lock:
+            return {key: dict(counts) for key, counts in self._totals_since(STORAGE, since).items()}
+
+    def log_counts(self, client, since=0):
+        with self._lock:
+            return dict(self._totals_since(LOG_COUNT, since).get(client_key(client), {}))
+
+    def replay(self, engine, kind, apply, since=0):
+        # Apply to engine, in order, the records of kind it has not seen yet
+        # from journal position since on: a watermark(), or a function of a
+        # record giving the watermark of its source
+        with self._lock:
+            journal = self._journal[kind]
+            start = self._replayed.get(engine, 0)
+            for position in range(start, len(journal)):
+                record = journal[position]
+                if position >= (since(record) if callable(since) else since):
+                    apply(record)
+            self._replayed[engine] = len(journal)
+            return len(journal) - start
+
+
+def _json_lines(text):
+    for line in io.StringIO(text):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield {}
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_feed():
+    # One feed per process, shared by every session; reruns poll it for new records
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = Feed(os.environ.get("TT_FEED") or None, os.environ.get("TT_FEED_DIR") or None)
+        return _feed
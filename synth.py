@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalog import Catalog, Client
+
+
+# Synthetic client corpus in exactly the layout of the bundled data, for load
+# and capacity testing at sizes the real export never reaches:
+#
+#   housed_date.csv, bar_stack.csv, storage.csv, logs.csv
+#   <sleep file>.csv          one per client (Sleep, Program, ...)
+#   <Client Name>.csv         one per client (start_date, log, text, headline)
+#   <Client Name>.json        one per client (timeline title card + events)
+#
+# plus clients.jsonl, the client catalog for the corpus (TT_CATALOG), and
+# synth-manifest.jsonl listing every client with its Patient.ID, sleep file and
+# log length, which bench.py uses to pick the client it benchmarks.
+#
+#   python synth.py --clients 1000 --log-rows 200000 --out /tmp/tt-synth
+
+MANIFEST = "synth-manifest.jsonl"
+
+FIRST = """
+Aaron Adrian Alice Amber Andrew Angela Anisa Ben Brandon Brenda Carl Carrie Chris Cindy Colin Courtney Craig Dale
+Dana Darlene David Dawson Dean Diane Donna Doug Dylan Elaine Emily Eric Erin Frank Gail Gary Gordon Graham Grace
+Helen Ian Isaac Jack Jamie Janet Jason Jean Jesse Joanne Joel Joyce Karen Kelly Kevin Kual Lambert Laura Lee Leslie
+Linda Lisa Logan Lynn Marie Mark Martin Megan Michael Nathan Nicole Norman Pat Paul Peter Rachel Ray Rita Robert Roy
+Ruth Sandra Sean Shane Sharon Steve Tanya Terry Tina Todd Tracy Troy Victoria Wade Wayne Wendy
+""".split()
+
+LAST = """
+Anderson Auger Baswick Bear Bird Black Blackhorse Brown Burris Calf Chapman Crow Cardinal Cook Crowchild Day Eagle
+Fox Goodfeather Grant Grey Hunter Jarvis Johnson Kual Lafferty Lamb Lefthand Lunn Manyhorses Martin Medicine Miles
+Morin Nelson Noel Oldman Otter Paul Rabbit Raven Redcrow Runner Saikkonen Scout Smith Snow Starlight Stone Swampy
+Thok Thomas Twoyoungmen Walker Weaselfat Whitney Wildman Wolf Young
+""".split()
+
+NICKNAMES = [None] + """
+Adrian Bear D Dawn Douglas Isabelle Jay Kuany Kual Lynn Mo Red Roy Sunny Tee Wes
+""".split()
+
+PROGRAMS = [
+    "3rd Floor Male Night", "3rd Floor Male", "2nd Floor Night Overflow", "3rd Floor Female", "2nd Floor Night",
+    "Day Sleep (3rd Floor)", "Telus Convention Centre", "Transitional Housing Program", "1st Floor Riverfront",
+    "2507 Overflow", "5th Floor Male", "5th Floor Female", "1st Floor Lobby Overflow", "4th Floor Isolation",
+]
+PROGRAM_WEIGHTS = np.array([409, 347, 196, 161, 104, 54, 53, 48, 48, 15, 15, 7, 2, 1], dtype=float)
+
+REASONS = [
+    "Drop-In Centre", "Wellness Check", "Medication Delivery", "Phone Call", "Indirect/Case Mgmt", "Appointment",
+    "Emergency Response", "Drug Poisoning", "Walk-In", "Wound Care", "ASIS", "Housing", "Injection", "Lab",
+    "Pharm Follow up", "Drop-In Isolation", "Care Conference", "No show", "AISH/financial suppo", "Forms",
+]
+
+STORAGE = ["Disposable Storage", "Amnesty Tote", "Locker", "Personals"]
+
+# Case-note vocabulary, weighted towards the words that dominate real logs
+WORDS = """
+staff housing shelter appointment support worker discussed meeting locker bed program detox team referral plan
+income application rent apartment landlord keys moved unit room floor night day sleep breakfast lunch supper
+medication nurse clinic doctor hospital ambulance wellness check sober upset calm frustrated happy agreed
+requested explained reminded connected diversion intake assessment documents id card bank account cheque aish
+bar warning incident security police belongings storage tote amnesty laundry shower clothing phone call email
+family sister brother mother daughter son friend partner community elder ceremony smudge counselling addiction
+recovery treatment outreach transit ticket bus downtown office caseworker connector hub follow update
+""".split()
+WORD_WEIGHTS = 1.0 / np.arange(1, len(WORDS) + 1) ** 0.8
+
+HEADLINES = [
+    "{first} Meets With Housing Connector", "{first}'s Appointment Rescheduled", "Locker Issued to {first}",
+    "{first} Receives Warning for Missed Curfew", "Follow-up on {first}'s Income Application",
+    "{first} Moves Into New Unit", "Wellness Check Completed for {first}", "{first} Requests Detox Referral",
+    "{first} Connects With Family", "Staff Support {first} With ID Documents", "{first} Attends Intake Assessment",
+    "Bar Issued to {first} After Incident",
+]
+
+GENDERS = ["Female", "Male", "Non-binary"]
+ETHNICITIES = ["Aboriginal", "Caucasian", "African", "Asian", "Latin American", "Unknown"]
+
+EPOCH = np.datetime64("1970-01-01", "D")
+START = np.datetime64("2019-01-01", "D")
+END = np.datetime64("2023-08-08", "D")
+
+
+def client_names(n, rng):
+    # Unique "First Last" / "First Last (Nick)" names drawn without replacement. Past the
+    # FIRST x LAST x NICKNAMES pool the pool is drawn again with a number appended ("Jean Fox 2")
+    space = len(FIRST) * len(LAST) * len(NICKNAMES)
+    names = []
+    draw = 1
+    while len(names) < n:
+        for i in rng.choice(space, size=min(space, n - len(names)), replace=False):
+            first, rest = divmod(int(i), len(LAST) * len(NICKNAMES))
+            last, nick = divmod(rest, len(NICKNAMES))
+            name = f"{FIRST[first]} {LAST[last]}"
+            name = f"{name} ({NICKNAMES[nick]})" if NICKNAMES[nick] else name
+            names.append(f"{name} {draw}" if draw > 1 else name)
+        draw += 1
+    return names
+
+
+def split(total, n, rng, sigma=1.0):
+    # Split total rows over n clients with a long-tailed (lognormal) spread
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    weights = rng.lognormal(0.0, sigma, n)
+    counts = np.floor(weights / weights.sum() * total).astype(np.int64)
+    counts[np.argsort(-weights)[:total - counts.sum()]] += 1
+    return counts
+
+
+def to_dates(days):
+    return (EPOCH + np.asarray(days, dtype=np.int64).astype("timedelta64[D]")).astype("datetime64[D]")
+
+
+def sentences(n, rng, mean_words=36):
+    # n case notes of lognormally distributed length drawn from WORDS
+    lengths = np.clip(rng.lognormal(np.log(mean_words), 0.5, n).astype(np.int64), 5, 150)
+    words = np.asarray(WORDS, dtype=object)[rng.choice(len(WORDS), size=int(lengths.sum()), p=WORD_WEIGHTS / WORD_WEIGHTS.sum())]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [" ".join(words[bounds[i]:bounds[i + 1]]).capitalize() + "." for i in range(n)]
+
+
+def write_csv(df, path):
+    # The export is UTF-8 with a BOM and CRLF line endings
+    df.to_csv(path, index=False, encoding="utf-8-sig", lineterminator="\r\n")
+
+
+def write_summaries(out, clients, rng):
+    n = len(clients)
+
+    # housed_date.csv: zero to three "start-end" ranges per client
+    ranges = []
+    for _ in range(n):
+        k = rng.choice(4, p=[0.15, 0.5, 0.25, 0.1])
+        days = np.sort(rng.integers((START - EPOCH).astype(int), (END - EPOCH).astype(int), size=2 * k))
+        dates = to_dates(days).astype(str)
+        ranges.append(",".join(f"{dates[2 * j]}-{dates[2 * j + 1]}" for j in range(k)))
+    write_csv(pd.DataFrame({"client": clients, "housed_date": ranges}), os.path.join(out, "housed_date.csv"))
+
+    # storage.csv and logs.csv: the export pads client names with trailing spaces
+    padded = [c + " " * int(s) for c, s in zip(clients, rng.integers(1, 3, n))]
+    storage = pd.DataFrame({"Client": padded})
+    for column, lam in zip(STORAGE, [2, 10, 1, 0.5]):
+        storage[column] = rng.poisson(lam, n)
+    write_csv(storage, os.path.join(out, "storage.csv"))
+    write_csv(pd.DataFrame({"Client": padded, "Total Logs": rng.poisson(60, n), "Total Bars": rng.poisson(4, n)}), os.path.join(out, "logs.csv"))
+
+    # bar_stack.csv: a client name row, then one numbered row per visit reason,
+    # with runs of blank separator rows between some clients
+    patient_ids = np.sort(rng.choice(np.arange(1000, 1000 + 10 * n), size=n, replace=False))
+    rows, number = [], 0
+    for client, pid in zip(clients, patient_ids):
+        rows.append((client, None, None, None))
+        for reason in rng.choice(REASONS, size=rng.integers(1, 8), replace=False):
+            number += 1
+            rows.append((number, int(pid), reason, int(rng.integers(1, 12))))
+        rows.extend([(None, None, None, None)] * int(rng.choice(6, p=[0.6, 0.1, 0.1, 0.1, 0.05, 0.05])))
+    visits = pd.DataFrame(rows, columns=["", "Patient.ID", "Reason", "Visits"]).astype({"Patient.ID": "Int64", "Visits": "Int64"})
+    write_csv(visits, os.path.join(out, "bar_stack.csv"))
+    return patient_ids
+
+
+def write_sleep(path, rows, rng):
+    # Check-ins newest first, dd-mm-yyyy, totals only on the first row
+    end = (END - EPOCH).astype(int)
+    last = rng.integers(min((START - EPOCH).astype(int) + rows, end), end + 1)
+    days = last - np.sort(rng.choice(max(rows * 2, 1), size=rows, replace=False))
+    programs = np.asarray(PROGRAMS, dtype=object)[rng.choice(len(PROGRAMS), size=rows, p=PROGRAM_WEIGHTS / PROGRAM_WEIGHTS.sum())]
+    df = pd.DataFrame({"Sleep": pd.to_datetime(to_dates(days)).strftime("%d-%m-%Y"), "Program": programs})
+    for column in ["total_dp", "total_housing", "bars", "locker", "amnesty", "disp_storage", "personal_storage"]:
+        df[column] = pd.array([None] * rows, dtype="Int64")
+        if rows:
+            df.loc[0, column] = int(rng.poisson(5))
+    write_csv(df, path)
+
+
+def write_log(out, client, rows, rng):
+    # <Client>.csv and the matching <Client>.json timeline
+    first = client.split()[0]
+    start = rng.integers((START - EPOCH).astype(int), (END - EPOCH).astype(int))
+    days = np.sort(rng.integers(start, (END - EPOCH).astype(int) + 1, size=rows))
+    dates = to_dates(days).astype(str)
+    ids = [f"LOG{n:08d}" for n in rng.integers(10 ** 5, 10 ** 8, size=rows)]
+    texts = sentences(rows, rng)
+    headlines = [HEADLINES[i].format(first=first) for i in rng.integers(0, len(HEADLINES), size=rows)]
+    write_csv(pd.DataFrame({"start_date": dates, "log": ids, "text": texts, "headline": headlines}), os.path.join(out, f"{client}.csv"))
+
+    born = to_dates([rng.integers(-15000, 3000)])[0].astype(object)
+    title = {
+        "media": {"url": "", "caption": "", "credit": ""},
+        "text": {
+            "headline": client,
+            "text": (
+                f"<br/><span style='font-size:1.5em; font-weight:bold;'> {born:%b} {born.day}, {born.year} "
+                f"<br/>Gender: {rng.choice(GENDERS)}</b><br/>Ethnicity: {rng.choice(ETHNICITIES)}</b>"
+                f"<br/>Client ID: DI-ID{int(rng.integers(10 ** 8, 10 ** 9)):09d}</b><br/>Client Type: Housed</b>"
+                f"<br/>Number of Housing Outcomes: {int(rng.integers(0, 4))}</b></span>"
+            ),
+        },
+    }
+    events = [
+        {
+            "media": {"url": "", "caption": "", "credit": ""},
+            "start_date": {"year": d[:4], "month": d[5:7], "day": d[8:10]},
+            "text": {"headline": h, "text": f"{t}<br/><br/><b>Log ID:</b> {i}"},
+        }
+        for d, i, t, h in zip(dates, ids, texts, headlines)
+    ]
+    with open(os.path.join(out, f"{client}.json"), "w", encoding="utf-8") as f:
+        json.dump({"title": title, "events": events}, f, indent=4, ensure_ascii=False)
+
+
+def generate(out, clients=1000, log_rows=100000, sleep_rows=None, seed=0, log=print):
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    os.makedirs(out, exist_ok=True)
+    names = client_names(clients, rng)
+    patient_ids = write_summaries(out, names, rng)
+
+    log_counts = split(log_rows, clients, rng)
+    sleep_counts = split(sleep_rows if sleep_rows is not None else 120 * clients, clients, rng, sigma=0.7)
+    catalog = []
+    with open(os.path.join(out, MANIFEST), "w", encoding="utf-8") as manifest:
+        for i, (client, pid) in enumerate(zip(names, patient_ids)):
+            sleep_file = f"sleep_{i:06d}.csv"
+            write_sleep(os.path.join(out, sleep_file), int(sleep_counts[i]), rng)
+            write_log(out, client, int(log_counts[i]), rng)
+            manifest.write(json.dumps({"client": client, "patient_id": int(pid), "sleep": sleep_file, "logs": int(log_counts[i])}) + "\n")
+            catalog.append(Client(client, int(pid), sleep=sleep_file))
+            if (i + 1) % 1000 == 0:
+                log(f"{i + 1}/{clients} clients")
+    Catalog(catalog).save(os.path.join(out, "clients.jsonl"))
+    log(f"{clients} clients, {int(log_counts.sum())} log rows, {int(sleep_counts.sum())} sleep rows -> {out} ({time.perf_counter() - start:.1f}s)")
+
+
+def read_manifest(out):
+    with open(os.path.join(out, MANIFEST), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic client corpus in the app's file layout")
+    parser.add_argument("--out", required=True, help="directory to write the corpus into")
+    parser.add_argument("--clients", type=int, default=1000, help="number of clients")
+    parser.add_argument("--log-rows", type=int, default=100000, help="total case-log rows across all clients")
+    parser.add_argument("--sleep-rows", type=int, default=None, help="total sleep check-ins (default 120 per client)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.out, args.clients, args.log_rows, args.sleep_rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+# Words left out of the log word counts: English stopwords, case-note filler
+# ("writer", "acw", ...) and client / staff names.
+STOPWORDS = frozenset("""
+a about above after afterwards again against all almost alone along already also although always am among amongst
+amoungst amount an and another any anyhow anyone anything anyway are around as at be became because become becomes
+becoming been before beforehand behind being below beside besides between beyond bill both bottom but by call can
+cannot cant co con could couldnt cry describe detail did do does doing done down due during each eg eight either
+eleven else elsewhere empty enough etc even ever every everyone everything everywhere except few fifteen fifty fill
+find fire first five for former formerly forty found four from front full further get give go had has hasnt have
+having he he'd he'll he's hence her here here's hereafter hereby herein hereupon hers herself him himself his how
+how's however hundred i i'd i'll i'm i've ie if in inc indeed interest into is it it's its itself keep last latter
+latterly least less let's ltd made many may me meanwhile might mill mine more moreover most mostly move much must my
+myself name namely neither never nevertheless next nine no nobody none noone nor not nothing now nowhere of off often
+on once one only onto or other others otherwise ought our ours ourselves out over own part per perhaps please put
+rather re same see seem seemed seeming seems serious several she she'd she'll she's should show side since sincere six
+sixty so some somehow someone something sometime sometimes somewhere still such system take ten than that that's the
+their theirs them themselves then thence there there's thereafter thereby therefore therein thereupon these they
+they'd they'll they're they've thick thin third this those though three through throughout thru thus to together too
+top toward towards twelve twenty two un under until up upon us very via was we we'd we'll we're we've well were what
+what's whatever when when's whence whenever where where's whereafter whereas whereby wherein whereupon wherever whether
+which while whither who who's whoever whole whom whose why why's will with within without would yet you you'd you'll
+you're you've your yours yourself yourselves
+writer acw went said going also told come came s t c cm im like m ab ll 1
+client clients able called asked back later floor
+anisa armstrong leslie les victoria diandra
+carrie saikkonen colin anderson courtney bird darlene auger david thok dawson jarvis erin burris graham miles kelly
+baswick kual lambert medicinetraveller four horns michael goodfeather nathan lunn patricia chapman
+""".split())
+
+_WORD = re.compile(r"\w+")
+_DIGIT = re.compile(r"\d")
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+# File name of the persisted index inside the snapshot directory
+INDEX_FILE = "terms.npz"
+
+
+def tokenize(text, stopwords=STOPWORDS):
+    return [w for w in _WORD.findall(text.lower()) if w not in stopwords and not _DIGIT.search(w)]
+
+
+class TermIndex:
+    # Term frequencies per client and per day, built once from the log CSVs
+    # and extended as new log rows arrive (rows are keyed by log ID and date,
+    # so re-adding a file only counts the rows not seen before).
+    #
+    # Per-client and global counts answer treemap queries directly; a
+    # day-sorted (day, client, term, count) table answers date-range queries
+    # with a binary search and a bincount instead of re-tokenizing text.
+
+    def __init__(self):
+        self.terms = []
+        self.clients = []
+        self._term_ids = {}
+        self._client_ids = {}
+        self._seen = set()
+        self._client_counts = {}
+        self._global = Counter()
+        self._top = {}
+        self._pending = []
+        self._table = (np.empty(0, np.int32),) * 4 + (np.empty(0, np.int64),)
+        self._seq = 0
+        self._versions = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, client):
+        return client in self._client_ids
+
+    # ---- updates --------------------------------------------------------
+
+    def _id(self, ids, names, name):
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(names)
+            names.append(name)
+        return i
+
+    def add(self, client, text, date=None, log_id=None):
+        with self._lock:
+            day = int((np.datetime64(date, "D") - EPOCH).astype(np.int64)) if date is not None and not pd.isna(date) else -1
+            if log_id is not None:
+                # Log IDs are occasionally reused for entries on different days
+                key = (client, log_id, day)
+                if key in self._seen:
+                    return False
+                self._seen.add(key)
+
+            cid = self._id(self._client_ids, self.clients, client)
+            counts = Counter(self._id(self._term_ids, self.terms, w) for w in tokenize(text if isinstance(text, str) else ""))
+            self._client_counts.setdefault(cid, Counter()).update(counts)
+            self._global.update(counts)
+            self._top.pop(cid, None)
+            self._top.pop(None, None)
+
+            # seq keeps first-seen order so ties in top() rank as in a plain Counter
+            for tid, n in counts.items():
+                self._pending.append((day, cid, tid, n, self._seq))
+                self._seq += 1
+            return True
+
+    def add_frame(self, client, df):
+        # Add the rows of one client's log CSV (start_date, log, text, headline)
+        added = 0
+        dates = pd.to_datetime(df["start_date"], errors="coerce") if "start_date" in df else [None] * len(df)
+        logs = df["log"] if "log" in df else [None] * len(df)
+        for date, log_id, text in zip(dates, logs, df["text"]):
+            added += self.add(client, text, date, log_id)
+        if client not in self._client_ids:
+            self._id(self._client_ids, self.clients, client)
+        return added
+
+    def sync(self, client, version, load):
+        # Bring one client up to date with a source version (content hash /
+        # ETag); load() is only called, and only new rows counted, on a change
+        with self._lock:
+            if self._versions.get(client) == version:
+                return 0
+            added = self.add_frame(client, load())
+            self._versions[client] = version
+            return added
+
+    def _flush(self):
+        # Fold pending rows into the day-sorted table
+        if not self._pending:
+            return
+        new = np.array(self._pending, dtype=np.int64).T
+        self._pending = []
+        merged = [np.concatenate([old, col.astype(old.dtype)]) for old, col in zip(self._table, new)]
+        order = np.argsort(merged[0], kind="stable")
+        self._table = tuple(col[order] for col in merged)
+
+    # ---- queries --------------------------------------------------------
+
+    def top(self, client=None, k=50):
+        # Most frequent words for one client, or across all clients when None
+        with self._lock:
+            cid = None if client is None else self._client_ids.get(client)
+            if client is not None and cid is None:
+                return []
+            top = self._top.get(cid)
+            if top is None or len(top) < k:
+                counts = self._global if cid is None else self._client_counts.get(cid, Counter())
+                top = self._top[cid] = [(self.terms[t], n) for t, n in counts.most_common(max(k, 50))]
+            return top[:k]
+
+    def top_range(self, start=None, end=None, k=50, clients=None):
+        # Most frequent words in logs dated within [start, end], optionally for a subset of clients
+        with self._lock:
+            self._flush()
+            days, cids, tids, counts, _ = self._table
+            lo = 0 if start is None else np.searchsorted(days, _day(start), side="left")
+            hi = len(days) if end is None else np.searchsorted(days, _day(end), side="right")
+            cids, tids, counts = cids[lo:hi], tids[lo:hi], counts[lo:hi]
+            if clients is not None:
+                wanted = [self._client_ids[c] for c in clients if c in self._client_ids]
+                mask = np.isin(cids, wanted)
+                tids, counts = tids[mask], counts[mask]
+            totals = np.bincount(tids, weights=counts, minlength=len(self.terms))
+            k = min(k, int(np.count_nonzero(totals)))
+            if k <= 0:
+                return []
+            best = np.argpartition(-totals, k - 1)[:k]
+            best = best[np.argsort(-totals[best], kind="stable")]
+            return [(self.terms[t], int(totals[t])) for t in best]
+
+    # ---- persistence ----------------------------------------------------
+
+    def save(self, path):
+        with self._lock:
+            self._flush()
+            days, cids, tids, counts, seqs = self._table
+            seen_clients, seen_logs, seen_days = zip(*self._seen) if self._seen else ((), (), ())
+            tmp = path + ".tmp.npz"
+            np.savez(
+                tmp,
+                terms=np.array(self.terms, dtype=object),
+                clients=np.array(self.clients, dtype=object),
+                days=days, cids=cids, tids=tids, counts=counts, seqs=seqs,
+                seen_clients=np.array(seen_clients, dtype=object),
+                seen_logs=np.array(seen_logs, dtype=object),
+                seen_days=np.array(seen_days, dtype=np.int64),
+                versions=np.array(list(self._versions.items()), dtype=object).reshape(-1, 2),
+            )
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path, allow_pickle=True) as data:
+            index.terms = data["terms"].tolist()
+            index.clients = data["clients"].tolist()
+            index._table = (data["days"], data["cids"], data["tids"], data["counts"], data["seqs"])
+            index._seen = set(zip(data["seen_clients"].tolist(), data["seen_logs"].tolist(), data["seen_days"].tolist()))
+            index._versions = dict(data["versions"].tolist())
+        index._term_ids = {t: i for i, t in enumerate(index.terms)}
+        index._client_ids = {c: i for i, c in enumerate(index.clients)}
+
+        # Rebuild the per-client and global counters from the table in one grouped pass
+        _, cids, tids, counts, seqs = index._table
+        index._seq = int(seqs.max()) + 1 if len(seqs) else 0
+        rows = pd.DataFrame({"cid": cids, "tid": tids, "count": counts.astype(np.int64), "seq": seqs})
+        per_client = rows.groupby(["cid", "tid"]).agg(count=("count", "sum"), seq=("seq", "min")).reset_index().sort_values("seq")
+        for cid, group in per_client.groupby("cid", sort=False):
+            index._client_counts[cid] = Counter(dict(zip(group["tid"].tolist(), group["count"].tolist())))
+        overall = per_client.groupby("tid", sort=False).agg(count=("count", "sum"), seq=("seq", "min")).sort_values("seq")
+        index._global = Counter(dict(zip(overall.index.tolist(), overall["count"].tolist())))
+        return index
+
+
+def _day(value):
+    return int((np.datetime64(pd.Timestamp(value).date(), "D") - EPOCH).astype(np.int64))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(path=None):
+    # Process-wide index: loaded from the snapshot when ingest has built one,
+    # otherwise started empty and filled client by client on first view
+    global _index
+    with _index_lock:
+        if _index is None:
+            if path and os.path.exists(path):
+                _index = TermIndex.load(path)
+            else:
+                _index = TermIndex()
+        return _index
+
+
+def reset():
+    # Drop the process-wide index; the next get_index() reloads or starts empty
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,123 @@
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import schema
+
+
+# Per-client timeline event index. The page first gets a compact index of
+# event dates and headlines; full event bodies (log text, media) are only
+# decoded for the date window and page being shown, so a client with years of
+# logs costs the same to display as a new one.
+#
+# From the snapshot, dates are a memory-mapped column and each body is read
+# from its own byte range of the event column; without a snapshot the JSON is
+# parsed once per content version and kept here.
+
+PAGE_SIZE = 100
+
+
+def compact(value):
+    # Drop empty strings, empty objects and nulls (blank media cards, empty
+    # captions and credits) from a TimelineJS object
+    if isinstance(value, dict):
+        value = {k: compact(v) for k, v in value.items()}
+        return {k: v for k, v in value.items() if v not in ("", {}, None)}
+    if isinstance(value, list):
+        return [compact(v) for v in value]
+    return value
+
+
+class EventIndex:
+
+    def __init__(self, title, dates, headlines, load):
+        # dates ascending (undated events last); load(positions) returns the
+        # event dicts at those positions of the sorted order
+        self.title = title
+        self.dates = dates
+        self.headlines = headlines
+        self._load = load
+        self._dated = int(np.count_nonzero(~np.isnat(dates)))
+
+    @classmethod
+    def from_table(cls, table):
+        dates = np.asarray(table.array("start_date")).astype("datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        headlines = table.column("headline").to_numpy()[order]
+        load = lambda positions: [json.loads(s) for s in table.strings("event", order[positions])]
+        return cls(table.extra.get("title"), dates[order], headlines, load)
+
+    @classmethod
+    def from_json(cls, data):
+        events = data.get("events", [])
+        dates = schema.event_dates(events).to_numpy().astype("datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        headlines = np.array([e.get("text", {}).get("headline", "") for e in events], dtype=object)[order]
+        load = lambda positions: [events[i] for i in order[positions]]
+        return cls(data.get("title"), dates[order], headlines, load)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def first(self):
+        return self.dates[0].astype(object) if self._dated else None
+
+    @property
+    def last(self):
+        return self.dates[self._dated - 1].astype(object) if self._dated else None
+
+    def window(self, start=None, end=None):
+        # Positions [lo, hi) of the events dated within [start, end]
+        dated = self.dates[:self._dated]
+        lo = 0 if start is None else int(np.searchsorted(dated, np.datetime64(start, "D"), side="left"))
+        hi = self._dated if end is None else int(np.searchsorted(dated, np.datetime64(end, "D"), side="right"))
+        if start is None and end is None:
+            hi = len(self.dates)
+        return lo, max(lo, hi)
+
+    def pages(self, start=None, end=None, page_size=PAGE_SIZE):
+        lo, hi = self.window(start, end)
+        return max(1, math.ceil((hi - lo) / page_size))
+
+    def entries(self, start=None, end=None):
+        # The compact index: (date, headline) for every event in the window
+        lo, hi = self.window(start, end)
+        return self.dates[lo:hi], self.headlines[lo:hi]
+
+    def payload(self, start=None, end=None, page=0, page_size=PAGE_SIZE):
+        # TimelineJS document for one page of the window, bodies decoded here only
+        lo, hi = self.window(start, end)
+        lo = min(hi, lo + page * page_size)
+        events = [compact(e) for e in self._load(np.arange(lo, min(hi, lo + page_size)))]
+        data = {"events": events}
+        if self.title:
+            data["title"] = compact(self.title)
+        return data
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+MAX_INDEXES = 32
+
+
+def get_index(client, version, load):
+    # Process-wide LRU of event indexes keyed by client and source version;
+    # load() builds the index on a miss
+    key = (client, version)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = load()
+    with _lock:
+        for stale in [k for k in _indexes if k[0] == client]:
+            del _indexes[stale]
+        _indexes[key] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
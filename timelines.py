@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import schema
+from ingest import file_hash
+
+
+# Build stage for the per-client timeline JSON. Each <Client>.json is generated
+# from the client's log CSV (start_date, log, text, headline) and a profile
+# record in profiles.jsonl holding what the CSV does not: the title card and the
+# slide colours of highlighted log entries.
+#
+# Builds run in a process pool and are incremental: a client is rebuilt only
+# when the hash of its log CSV or profile record changes. The hash of every
+# written file is recorded too, and a timeline that is not the last build's
+# output (edited by hand, or never built) is left alone unless --overwrite.
+#
+#   python timelines.py [--source DIR] [--out DIR] [--workers N] [--force] [--overwrite]
+#   python timelines.py --extract-profiles    # seed profiles.jsonl from existing JSON
+
+PROFILES = "profiles.jsonl"
+STATE = ".timelines-state"
+BUILD_VERSION = 1
+
+_LOG_ID = re.compile(r"<b>Log ID:</b>\s*(\S+)\s*$")
+
+
+def read_profiles(path):
+    # {client: profile}; a profile is {"client", "log", "title", "backgrounds": {log ID: colour}}
+    with open(path, encoding="utf-8") as f:
+        return {p["client"]: p for p in map(json.loads, filter(str.strip, f))}
+
+
+def write_profiles(path, profiles):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for profile in profiles:
+            f.write(json.dumps(profile, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def build_key(csv_path, profile):
+    digest = hashlib.sha256(f"{BUILD_VERSION}:{file_hash(csv_path)}:".encode())
+    digest.update(json.dumps(profile, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def events(df, backgrounds):
+    # One TimelineJS slide per log row, in file order; rows without a date are skipped
+    dates = pd.to_datetime(df["start_date"], errors="coerce")
+    slides = []
+    for date, log_id, text, headline in zip(dates, df["log"], df["text"], df["headline"]):
+        if pd.isna(date):
+            continue
+        slide = {
+            "media": {"url": "", "caption": "", "credit": ""},
+            "start_date": {"year": f"{date.year}", "month": f"{date.month:02d}", "day": f"{date.day:02d}"},
+            "text": {"headline": headline, "text": f"{text}<br/><br/><b>Log ID:</b> {log_id}"},
+        }
+        if log_id in backgrounds:
+            slide["background"] = {"color": backgrounds[log_id]}
+        slides.append(slide)
+    return slides
+
+
+def build_client(job):
+    # Runs in a worker process: (profile, csv path, output path) -> (client, slides, seconds)
+    profile, csv_path, out_path = job
+    start = time.perf_counter()
+    df = pd.read_csv(csv_path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    slides = events(df, profile.get("backgrounds", {}))
+    data = {"title": profile["title"], "events": slides}
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, out_path)
+    return profile["client"], len(slides), time.perf_counter() - start
+
+
+def build(source, out=None, profiles_path=None, workers=None, force=False, overwrite=False, log=print):
+    out = out or source
+    profiles = read_profiles(profiles_path or os.path.join(source, PROFILES))
+    state_path = os.path.join(out, STATE)
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    # {client: {"key": build key, "output": hash of the written JSON}}; older states held just the key
+    state = {c: e if isinstance(e, dict) else {"key": e, "output": None} for c, e in state.items()}
+
+    jobs, keys = [], {}
+    skipped = kept = 0
+    for client, profile in profiles.items():
+        csv_path = os.path.join(source, profile.get("log", f"{client}.csv"))
+        if not os.path.exists(csv_path):
+            log(f"skip   {client}: no log file {os.path.basename(csv_path)}")
+            continue
+        out_path = os.path.join(out, f"{client}.json")
+        key = keys[client] = build_key(csv_path, profile)
+        entry = state.get(client, {})
+        exists = os.path.exists(out_path)
+        if not force and entry.get("key") == key and exists:
+            skipped += 1
+            continue
+        if exists and not overwrite and entry.get("output") != file_hash(out_path):
+            log(f"keep   {client}.json: not the last build's output (--overwrite replaces it)")
+            kept += 1
+            continue
+        jobs.append((profile, csv_path, out_path))
+
+    start = time.perf_counter()
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(build_client, jobs))
+    else:
+        results = [build_client(job) for job in jobs]
+    for client, slides, seconds in results:
+        state[client] = {"key": keys[client], "output": file_hash(os.path.join(out, f"{client}.json"))}
+        log(f"built  {client}.json ({slides} events, {seconds:.3f}s)")
+
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({c: k for c, k in state.items() if c in profiles}, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, state_path)
+    log(f"{len(results)} built, {skipped} unchanged, {kept} kept -> {out} ({time.perf_counter() - start:.2f}s)")
+    return results
+
+
+def extract_profiles(source, log=print):
+    # Seed profiles.jsonl from the hand-maintained timelines: their title cards
+    # and the log IDs of the slides given a background colour
+    logs = {}
+    for name in sorted(os.listdir(source)):
+        if name.endswith(".csv") and schema.classify(name, pd.read_csv(os.path.join(source, name), nrows=0, encoding="utf-8-sig").columns) == schema.LOG:
+            logs[_squash(name[:-len(".csv")])] = name
+
+    profiles = []
+    for name in sorted(os.listdir(source)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(source, name), encoding="utf-8") as f:
+            data = json.load(f)
+        if "events" not in data:
+            continue
+        client = name[:-len(".json")]
+        backgrounds = {}
+        for event in data["events"]:
+            match = _LOG_ID.search(event.get("text", {}).get("text", ""))
+            if match and "background" in event:
+                backgrounds[match.group(1)] = event["background"]["color"]
+        profile = {"client": client, "log": logs.get(_squash(client), f"{client}.csv"), "title": data.get("title")}
+        if backgrounds:
+            profile["backgrounds"] = backgrounds
+        profiles.append(profile)
+    write_profiles(os.path.join(source, PROFILES), profiles)
+    log(f"{len(profiles)} profiles -> {os.path.join(source, PROFILES)}")
+
+
+def _squash(name):
+    # Match a timeline to its log CSV when the two spell the name differently
+    return re.sub(r"\s+", "", name).lower()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the client timeline JSON from the log CSVs and profiles")
+    parser.add_argument("--source", default=os.path.dirname(os.path.abspath(__file__)), help="directory holding the log CSVs and profiles.jsonl")
+    parser.add_argument("--out", help="directory to write the timelines to (default: --source)")
+    parser.add_argument("--profiles", help="profile records (default: <source>/profiles.jsonl)")
+    parser.add_argument("--workers", type=int, default=None, help="build processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild every client regardless of content hash")
+    parser.add_argument("--overwrite", action="store_true", help="replace timelines that are not the last build's output")
+    parser.add_argument("--extract-profiles", action="store_true", help="write profiles.jsonl from the existing timeline JSON and exit")
+    args = parser.parse_args(argv)
+    if args.extract_profiles:
+        extract_profiles(args.source)
+        return
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    build(args.source, args.out, args.profiles, args.workers, args.force, args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+# Lightweight span tracing for the page hot path: fetch, parse, aggregate,
+# figure and render stages are wrapped in nested timing spans carrying cache
+# hit/miss and byte counts. Off unless TT_TRACE is set; while off, span()
+# returns a shared no-op and note() returns after one flag check.
+#
+# When on, the spans of each rerun are collected for the sidebar profiling
+# panel and every span is appended to a rotating JSON-lines file of Chrome
+# trace events. `python tracing.py FILE > trace.json` wraps one for
+# chrome://tracing or Perfetto.
+#
+#   TT_TRACE=1  TT_TRACE_FILE=<tmp>/tt-trace.jsonl  TT_TRACE_MAX_MB=16
+
+ENABLED = os.environ.get("TT_TRACE", "").lower() in ("1", "true", "yes", "on")
+TRACE_FILE = os.environ.get("TT_TRACE_FILE", os.path.join(tempfile.gettempdir(), "tt-trace.jsonl"))
+MAX_BYTES = int(float(os.environ.get("TT_TRACE_MAX_MB", 16)) * 1024 * 1024)
+BACKUPS = 3
+
+_local = threading.local()
+_logger = None
+_logger_lock = threading.Lock()
+_pid = os.getpid()
+
+
+class Span:
+    __slots__ = ("name", "args", "depth", "start", "duration")
+
+    def __init__(self, name, args, depth):
+        self.name = name
+        self.args = args
+        self.depth = depth
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        stack = _stack()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _stack().pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        spans = getattr(_local, "spans", None)
+        if spans is not None:
+            spans.append(self)
+        _write(self)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def span(name, **args):
+    if not ENABLED:
+        return _NOOP
+    return Span(name, args, len(_stack()))
+
+
+def note(**args):
+    # Attach attributes to the innermost open span on this thread
+    if not ENABLED:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].args.update(args)
+
+
+class Rerun:
+    # Collects the spans finished on this thread between enter and exit; a
+    # Streamlit rerun runs on one script thread, so these are that rerun's spans
+
+    def __init__(self, label):
+        self.label = label
+        self.spans = []
+        self.duration = 0.0
+
+    def __enter__(self):
+        if ENABLED:
+            _local.spans = self.spans
+            self._span = Span("rerun", {"page": self.label}, len(_stack())).__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            self._span.__exit__(exc_type, exc, tb)
+            self.duration = self._span.duration
+            _local.spans = None
+        return False
+
+    def stages(self):
+        # Self time per span name: each span's duration minus its children's
+        totals = {}
+        child_time = [0.0] * (max((s.depth for s in self.spans), default=0) + 2)
+        for s in self.spans:
+            # Spans finish children-first, so a span's children are already counted
+            own = s.duration - child_time[s.depth + 1]
+            child_time[s.depth + 1] = 0.0
+            child_time[s.depth] += s.duration
+            totals[s.name] = totals.get(s.name, 0.0) + own
+        return totals
+
+
+def rerun(label):
+    return Rerun(label)
+
+
+def _write(s):
+    logger = _get_logger()
+    if logger is None:
+        return
+    event = {
+        "name": s.name,
+        "ph": "X",
+        "ts": round(s.start * 1e6, 1),
+        "dur": round(s.duration * 1e6, 1),
+        "pid": _pid,
+        "tid": threading.get_ident(),
+        "args": s.args,
+    }
+    logger.info(json.dumps(event, default=str))
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                logger = logging.getLogger("tt.trace")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                try:
+                    handler = logging.handlers.RotatingFileHandler(TRACE_FILE, maxBytes=MAX_BYTES, backupCount=BACKUPS, encoding="utf-8")
+                except OSError:
+                    logger.disabled = True
+                else:
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+                _logger = logger
+    return None if _logger.disabled else _logger
+
+
+def main(argv=None):
+    # Wrap a JSON-lines trace file as a Chrome trace document on stdout
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else TRACE_FILE
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()